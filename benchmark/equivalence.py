@@ -0,0 +1,388 @@
+import argparse
+import io as _io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from src.common import path_config
+from benchmark import synthetic
+
+'''
+기준 구현(reference)과 최적화한 구현(candidate)의 산출물 동일성 검사 (golden output)
+- 두 구현을 각각 임시 디렉토리에 풀고(git ref 또는 현재 작업 트리) 같은 입력으로 단계 CLI 4개를 순서대로 실행
+  입력: 저장소의 지역 데이터(--regions) + 합성 데이터(--synthetic_sizes, benchmark/synthetic.py)
+- 모든 산출물(shapefile/GeoParquet/CSV)의 모든 공통 열을 비교
+  (Relation, comp_idx, iou_*, ol_*, bd_status, cd_class, class_10 ...)
+  숫자 열은 np.isclose(rtol, atol), 문자열/list 열은 값 일치, geometry는 normalize 후 equals_exact(tolerance)
+  행은 poly1_idx/poly2_idx가 있으면 그 순서로 맞춤, 한쪽에만 있는 열은 불일치가 아니라 목록으로 보고
+- 단계별 실행 시간(무거운 라이브러리 import 제외)과 speedup(reference / candidate)을 함께 보고
+기본 reference는 저장소의 첫 commit (networkx 필요), candidate는 현재 작업 트리
+저장소 최상위에서 실행: python -m benchmark.equivalence --regions suseo --synthetic_sizes 2000
+'''
+
+# (단계 이름, module, CLI 인자) - 임계값은 main.default_thresholds와 같은 값
+stages = [
+    ("Evaluate Building Detection", "src.evaluation.evaluate_building_detection",
+     ["--cut_threshold", "0.05", "--bd_threshold", "0.6"]),
+    ("Create Change Detection GT", "src.core.map_validation.create_change_detection_gt",
+     ["--cut_threshold", "0.05", "--cd_threshold", "0.95"]),
+    ("Detect Change", "src.core.building_change_detection.detect_building_change",
+     ["--cut_threshold", "0.05", "--cd_threshold", "0.7"]),
+    ("Evaluate Change Detection", "src.evaluation.evaluate_building_change_detection", [])
+]
+
+input_keys = ["GT_of_building_detection", "building_inference", "previous_building_digital_map"]
+
+output_keys = [
+    "evaluation_of_building_detection_gt", "evaluation_of_building_detection_predict",
+    "evaluation_of_building_detection_anl", "evaluation_of_building_detection",
+    "GT_of_building_change_detection_prev", "GT_of_building_change_detection_cur",
+    "GT_of_building_change_detection_anl",
+    "building_change_detection_result_prev", "building_change_detection_result_cur",
+    "building_change_detection_result_anl", "evaluation_of_building_change_detection",
+    "evaluation_of_building_change_detection_prev", "evaluation_of_building_change_detection_cur"
+]
+
+# 한쪽 config에 없는 key는 이 key의 산출물과 비교
+# (이전 구현은 Evaluate Change Detection 결과를 Detect Change 결과 경로에 다시 씀)
+output_aliases = {
+    "evaluation_of_building_change_detection_prev": "building_change_detection_result_prev",
+    "evaluation_of_building_change_detection_cur": "building_change_detection_result_cur"
+}
+
+# 번호 자체가 아니라 같은 component로 묶였는지(분할이 같은지)만 비교하는 열
+label_columns = ["comp_idx"]
+
+# 같은 이름의 산출물이 여러 형식으로 있으면 이 순서로 선택 (양쪽에 공통으로 있는 형식 우선)
+formats = [".shp", ".parquet", ".csv"]
+
+# 각 트리의 interpreter에서 단계 CLI의 main()을 실행하고 소요 시간 출력
+runner = '''
+import sys, time, warnings, importlib
+warnings.simplefilter("ignore")
+for name in ("numpy", "pandas", "geopandas", "shapely", "pyogrio", "scipy.sparse"):
+    importlib.import_module(name)
+module = importlib.import_module(sys.argv[1])
+sys.argv = sys.argv[1:]
+start = time.perf_counter()
+module.main()
+io = importlib.import_module("src.utils.io")
+if hasattr(io, "flush_exports"):
+    io.flush_exports()
+print("STAGE_SECONDS", time.perf_counter() - start)
+'''
+
+
+def prepare_tree(repo_dir, ref, dest):
+    # ref: git ref 또는 "worktree"(commit하지 않은 변경 포함 현재 파일)
+    os.makedirs(dest)
+    if ref == "worktree":
+        for name in ("src", "config"):
+            shutil.copytree(os.path.join(repo_dir, name), os.path.join(dest, name),
+                            ignore=shutil.ignore_patterns("__pycache__"))
+        return
+    archive = subprocess.run(["git", "archive", "--format=tar", ref, "src", "config"], cwd=repo_dir,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=_io.BytesIO(archive)) as tar:
+        tar.extractall(dest)
+
+
+def tree_paths(tree, region, year, previous_year):
+    # path_config.load_paths와 같은 규칙 (트리의 코드를 import하지 않고 config만 읽음)
+    with open(os.path.join(tree, "config", "config.json"), "r", encoding="utf-8") as f:
+        paths = json.load(f)["building"]
+    return {key: os.path.join(tree, path.format(year=year, previous_year=previous_year, region=region))
+            for key, path in paths.items() if not key.startswith("_")}
+
+
+def place_region_inputs(repo_dir, tree, region, year, previous_year):
+    source = tree_paths(repo_dir, region, year, previous_year)
+    target = tree_paths(tree, region, year, previous_year)
+    for key in input_keys:
+        shutil.copytree(source[key], target[key])
+
+
+def place_synthetic_inputs(tree, region, frames, year, previous_year):
+    target = tree_paths(tree, region, year, previous_year)
+    for key, gdf in frames.items():
+        os.makedirs(target[key], exist_ok=True)
+        gdf.to_file(os.path.join(target[key], f"{region}.shp"), driver="ESRI Shapefile", encoding="euc-kr")
+
+
+def synthetic_frames(size, seed):
+    # 현재 수치지도(GT) / 추론 결과 쌍 + 이전 연도 수치지도
+    dmap, seg, _ = synthetic.make_pair(size, seed=seed)
+    previous = synthetic.make_previous(dmap, seed=seed + 1)
+    return {"GT_of_building_detection": dmap, "building_inference": seg, "previous_building_digital_map": previous}
+
+
+def run_stages(tree, region, year, previous_year):
+    seconds = {}
+    for name, module, args in stages:
+        result = subprocess.run(
+            [sys.executable, "-c", runner, module, "--region", region, "--year", year,
+             "--previous_year", previous_year, *args],
+            cwd=tree, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": tree})
+        if result.returncode != 0:
+            raise RuntimeError(f"{name} 실패 ({tree}):\n{result.stderr[-3000:]}")
+        marker = [line for line in result.stdout.splitlines() if line.startswith("STAGE_SECONDS")][-1]
+        seconds[name] = round(float(marker.split()[1]), 4)
+    return seconds
+
+
+def output_files(directory):
+    # 파일 이름(확장자 제외) -> {확장자: 경로}
+    files = {}
+    if os.path.isdir(directory):
+        for f in os.listdir(directory):
+            stem, ext = os.path.splitext(f)
+            if ext in formats:
+                files.setdefault(stem, {})[ext] = os.path.join(directory, f)
+    return files
+
+
+def pick_formats(ref_files, new_files):
+    common = [ext for ext in formats if ext in ref_files and ext in new_files]
+    if common:
+        return common[0], common[0]
+    pick = lambda files: next(ext for ext in formats if ext in files)
+    return pick(ref_files), pick(new_files)
+
+
+def read_output(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path, encoding="utf-8-sig")
+    if path.endswith(".parquet"):
+        return gpd.read_parquet(path)
+    return gpd.read_file(path)
+
+
+def normalize_frame(df, truncate):
+    # shapefile과 비교할 때는 열 이름 10자 제한, list 열은 shapefile에 저장되는 문자열 형태로
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].map(lambda v: str(v.tolist() if isinstance(v, np.ndarray) else list(v))
+                                  if isinstance(v, (list, tuple, np.ndarray)) else v)
+    if truncate:
+        df.columns = [col if col == "geometry" else col[:10] for col in df.columns]
+    return df
+
+
+def compare_labels(a, b):
+    # 한 reference 번호가 여러 candidate 번호로 나뉘거나 그 반대인 행의 mask
+    pairs = pd.DataFrame({"a": a.astype(str).to_numpy(), "b": b.astype(str).to_numpy()})
+    split = pairs.groupby("a")["b"].transform("nunique") > 1
+    merged = pairs.groupby("b")["a"].transform("nunique") > 1
+    return (split | merged).to_numpy()
+
+
+def sort_rows(df, columns):
+    # poly index 열이 없는 표(보고서 등)는 값 기준으로 정렬해서 행 순서 차이를 무시
+    keys = pd.DataFrame(index=df.index)
+    for col in columns:
+        if isinstance(df[col], gpd.GeoSeries):
+            keys[col] = shapely.to_wkb(shapely.normalize(np.asarray(df[col].values)), hex=True)
+        elif pd.api.types.is_float_dtype(df[col]):
+            keys[col] = df[col].round(6).astype(str)
+        else:
+            keys[col] = df[col].astype(str)
+    return df.loc[keys.sort_values(list(keys.columns), kind="stable").index].reset_index(drop=True)
+
+
+def compare_column(a, b, rtol, atol, geometry_tolerance):
+    # 값이 다른 행의 mask 반환
+    if a.name in label_columns:
+        return compare_labels(a, b)
+    if isinstance(a, gpd.GeoSeries) or isinstance(b, gpd.GeoSeries):
+        a, b = np.asarray(a.values, dtype=object), np.asarray(b.values, dtype=object)
+        missing = pd.isna(a) | pd.isna(b)
+        equal = np.zeros(len(a), dtype=bool)
+        both = ~missing
+        equal[both] = shapely.equals_exact(shapely.normalize(a[both]), shapely.normalize(b[both]),
+                                           tolerance=geometry_tolerance)
+        return ~(equal | (pd.isna(a) & pd.isna(b)))
+
+    numeric = pd.api.types.is_numeric_dtype(a) or pd.api.types.is_numeric_dtype(b)
+    if numeric:
+        try:
+            a_num = pd.to_numeric(a).to_numpy(dtype=float)
+            b_num = pd.to_numeric(b).to_numpy(dtype=float)
+            return ~np.isclose(a_num, b_num, rtol=rtol, atol=atol, equal_nan=True)
+        except (ValueError, TypeError):
+            pass
+    a_str = a.map(lambda v: None if v is None or (isinstance(v, float) and np.isnan(v)) else str(v))
+    b_str = b.map(lambda v: None if v is None or (isinstance(v, float) and np.isnan(v)) else str(v))
+    return (a_str != b_str).to_numpy() & ~(a_str.isna() & b_str.isna()).to_numpy()
+
+
+def compare_frames(ref, new, rtol, atol, geometry_tolerance, max_examples=5):
+    result = {"rows": [len(ref), len(new)], "only_reference": [], "only_candidate": [], "mismatches": {}}
+    # 같은 polygon끼리 비교하도록 index 열 기준 정렬
+    key = next((k for k in ("poly1_idx", "poly2_idx") if k in ref.columns and k in new.columns), None)
+    if key:
+        ref = ref.sort_values(key, kind="stable").reset_index(drop=True)
+        new = new.sort_values(key, kind="stable").reset_index(drop=True)
+    elif len(ref) == len(new):
+        columns = [col for col in ref.columns if col in new.columns and col not in label_columns]
+        ref, new = sort_rows(ref, columns), sort_rows(new, columns)
+    if len(ref) != len(new):
+        result["mismatches"]["<rows>"] = {"count": abs(len(ref) - len(new)), "examples": []}
+        return result
+    if key and not (ref[key].to_numpy() == new[key].to_numpy()).all():
+        result["mismatches"][f"<{key}>"] = {"count": int((ref[key] != new[key]).sum()), "examples": []}
+        return result
+
+    result["only_reference"] = [col for col in ref.columns if col not in new.columns]
+    result["only_candidate"] = [col for col in new.columns if col not in ref.columns]
+    for col in [col for col in ref.columns if col in new.columns]:
+        mismatch = compare_column(ref[col], new[col], rtol, atol, geometry_tolerance)
+        if mismatch.any():
+            rows = np.flatnonzero(mismatch)[:max_examples]
+            result["mismatches"][col] = {
+                "count": int(mismatch.sum()),
+                "examples": [{"row": int(i), key or "index": str(ref[key].iloc[i]) if key else int(i),
+                              "reference": str(ref[col].iloc[i]), "candidate": str(new[col].iloc[i])} for i in rows]
+            }
+    result["columns"] = len(ref.columns) - len(result["only_reference"])
+    return result
+
+
+def compare_outputs(ref_tree, new_tree, region, year, previous_year, rtol, atol, geometry_tolerance):
+    ref_paths = tree_paths(ref_tree, region, year, previous_year)
+    new_paths = tree_paths(new_tree, region, year, previous_year)
+    # alias로 대신 비교하는 key는 해당 트리에서 Evaluate Change Detection 결과로 덮어쓴 것이므로 따로 비교하지 않음
+    overwritten = {output_aliases[key] for key in output_aliases if key not in ref_paths or key not in new_paths}
+    results = []
+    for key in output_keys:
+        if key in overwritten:
+            continue
+        ref_key = key if key in ref_paths else output_aliases[key]
+        new_key = key if key in new_paths else output_aliases[key]
+        ref_files, new_files = output_files(ref_paths[ref_key]), output_files(new_paths[new_key])
+        for stem in sorted(set(ref_files) | set(new_files)):
+            if stem not in ref_files or stem not in new_files:
+                results.append({"output": f"{key}/{stem}", "missing": "candidate" if stem in ref_files else "reference"})
+                continue
+            ref_ext, new_ext = pick_formats(ref_files[stem], new_files[stem])
+            truncate = ".shp" in (ref_ext, new_ext)
+            ref = normalize_frame(read_output(ref_files[stem][ref_ext]), truncate)
+            new = normalize_frame(read_output(new_files[stem][new_ext]), truncate)
+            result = compare_frames(ref, new, rtol, atol, geometry_tolerance)
+            results.append({"output": f"{key}/{stem}", "formats": [ref_ext, new_ext], **result})
+    return results
+
+
+def run_dataset(repo_dir, work_dir, reference, candidate, dataset, args):
+    # dataset: {"region": 이름, "frames": 합성 입력(None이면 저장소의 지역 데이터)}
+    region = dataset["region"]
+    trees = {}
+    for side, ref in (("reference", reference), ("candidate", candidate)):
+        tree = os.path.join(work_dir, region, side)
+        prepare_tree(repo_dir, ref, tree)
+        if dataset["frames"] is None:
+            place_region_inputs(repo_dir, tree, region, args.year, args.previous_year)
+        else:
+            place_synthetic_inputs(tree, region, dataset["frames"], args.year, args.previous_year)
+        trees[side] = tree
+
+    seconds = {side: run_stages(tree, region, args.year, args.previous_year) for side, tree in trees.items()}
+    outputs = compare_outputs(trees["reference"], trees["candidate"], region, args.year, args.previous_year,
+                              args.rtol, args.atol, args.geometry_tolerance)
+    total_ref, total_new = sum(seconds["reference"].values()), sum(seconds["candidate"].values())
+    return {
+        "region": region,
+        "seconds": seconds,
+        "speedup": {name: round(seconds["reference"][name] / max(seconds["candidate"][name], 1e-9), 2)
+                    for name in seconds["reference"]},
+        "total_speedup": round(total_ref / max(total_new, 1e-9), 2),
+        "num_mismatched": sum(bool(o.get("missing") or o.get("mismatches")) for o in outputs),
+        "outputs": outputs
+    }
+
+
+def print_dataset(result):
+    print(f"\n[{result['region']}] 전체 speedup {result['total_speedup']}x")
+    for name, ref_s in result["seconds"]["reference"].items():
+        print(f"  {name:<30} reference {ref_s:>8.2f}s  candidate {result['seconds']['candidate'][name]:>8.2f}s  "
+              f"{result['speedup'][name]:>6.2f}x")
+    for output in result["outputs"]:
+        if output.get("missing"):
+            print(f"  불일치 {output['output']}: {output['missing']}에 없음")
+        elif output["mismatches"]:
+            cols = ", ".join(f"{col}({m['count']})" for col, m in output["mismatches"].items())
+            print(f"  불일치 {output['output']}: {cols}")
+        else:
+            print(f"  일치   {output['output']} ({output['rows'][0]}행, {output['columns']}열"
+                  f"{', candidate에만 있는 열: ' + ', '.join(output['only_candidate']) if output['only_candidate'] else ''})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기준 구현과 최적화 구현의 산출물 동일성 검사 및 speedup 측정")
+    parser.add_argument("--reference", type=str, default=None, help="기준 구현 git ref (기본값: 저장소의 첫 commit)")
+    parser.add_argument("--candidate", type=str, default="worktree",
+                        help="비교할 구현 git ref (기본값: worktree, commit하지 않은 변경 포함 현재 파일)")
+    parser.add_argument("--regions", type=str, default="suseo", help="저장소 데이터 지역 목록 (쉼표 구분, all: 전체, none: 없음)")
+    parser.add_argument("--synthetic_sizes", type=str, default="2000", help="합성 데이터 건물 수 목록 (쉼표 구분, 빈 값: 없음)")
+    parser.add_argument("--seed", type=int, default=0, help="합성 데이터 seed (기본값: 0)")
+    parser.add_argument("--year", type=str, default="2022", help="기준 연도 (기본값: 2022)")
+    parser.add_argument("--previous_year", type=str, default="2020", help="이전 연도 (기본값: 2020)")
+    parser.add_argument("--rtol", type=float, default=1e-6, help="숫자 열 상대 허용 오차 (기본값: 1e-6)")
+    parser.add_argument("--atol", type=float, default=1e-9, help="숫자 열 절대 허용 오차 (기본값: 1e-9)")
+    parser.add_argument("--geometry_tolerance", type=float, default=1e-6, help="geometry 좌표 허용 오차 (m, 기본값: 1e-6)")
+    parser.add_argument("--output", type=str, default="./report/benchmark/equivalence.json", help="결과 JSON 경로")
+    parser.add_argument("--keep", action="store_true", help="실행에 사용한 임시 트리(산출물 포함) 유지")
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    reference = args.reference or subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=repo_dir,
+                                                 capture_output=True, text=True, check=True).stdout.split()[0]
+
+    if args.regions == "all":
+        regions = list(path_config.regions)
+    elif args.regions == "none":
+        regions = []
+    else:
+        regions = [r.strip() for r in args.regions.split(",") if r.strip()]
+    datasets = [{"region": region, "frames": None} for region in regions]
+    for size in [int(s) for s in args.synthetic_sizes.split(",") if s.strip()]:
+        datasets.append({"region": f"synthetic{size}", "frames": synthetic_frames(size, args.seed)})
+
+    work_dir = tempfile.mkdtemp(prefix="equivalence_")
+    results = []
+    try:
+        for dataset in datasets:
+            try:
+                result = run_dataset(repo_dir, work_dir, reference, args.candidate, dataset, args)
+            except RuntimeError as e:
+                result = {"region": dataset["region"], "error": str(e), "num_mismatched": 1}
+                print(f"\n[{dataset['region']}] 실행 실패\n{e}")
+            else:
+                print_dataset(result)
+            results.append(result)
+    finally:
+        if args.keep:
+            print(f"\n임시 트리: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"reference": reference, "candidate": args.candidate, "rtol": args.rtol, "atol": args.atol,
+              "geometry_tolerance": args.geometry_tolerance, "datasets": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    num_mismatched = sum(result["num_mismatched"] for result in results)
+    print(f"\n불일치 산출물 {num_mismatched}개, 결과: {args.output}")
+    return 1 if num_mismatched else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
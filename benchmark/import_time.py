@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+'''
+실행부(entry point)별 시작 시간 / import 시간 측정 및 예산 검사
+- import: python -X importtime으로 측정한 entry point module의 누적 import 시간
+- help: python -m <module> --help 전체 실행 시간 (interpreter 시작 포함)
+- heavy: import만 했을 때 불러온 무거운 의존성 (처음 사용할 때 import해야 하므로 비어 있어야 함)
+import 시간이 예산을 넘거나 무거운 의존성을 import하면 종료 코드 1 (CI/배포 전 확인용)
+저장소 최상위에서 실행: python -m benchmark.import_time
+'''
+
+entry_points = [
+    "src.main",
+    "src.batch",
+    "src.core.building_change_detection.detect_building_change",
+    "src.core.map_validation.create_change_detection_gt",
+    "src.evaluation.evaluate_building_detection",
+    "src.evaluation.evaluate_building_change_detection"
+]
+
+# import 시점에 불러오면 안 되는 의존성 (src.utils.lazy로 처음 사용할 때 import)
+heavy_modules = ["pandas", "geopandas", "numpy", "scipy", "shapely", "pyogrio", "pyproj", "rasterio",
+                 "matplotlib", "networkx", "pyarrow"]
+
+# --help에 인자가 필요한 실행부 (main.py는 대화형이므로 --help 측정 제외)
+help_entry_points = [module for module in entry_points if module != "src.main"]
+
+
+def run_python(args, repo_dir):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=repo_dir, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} 실패:\n{result.stderr}")
+    return result, seconds
+
+
+def measure_import(module, repo_dir):
+    # -X importtime 출력의 마지막 줄: entry point module의 누적(cumulative) 시간 (us)
+    result, _ = run_python(["-X", "importtime", "-c", f"import {module}"], repo_dir)
+    last_line = [line for line in result.stderr.splitlines() if line.startswith("import time:")][-1]
+    return int(last_line.split("|")[1]) / 1000
+
+
+def loaded_heavy_modules(module, repo_dir):
+    code = (f"import sys, json, {module}; "
+            f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy_modules!r}))))")
+    result, _ = run_python(["-c", code], repo_dir)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(repo_dir, repeat=5):
+    # 반복 측정 중 최솟값 사용 (디스크 캐시, 다른 process 영향 최소화)
+    startup_ms = min(run_python(["-c", "pass"], repo_dir)[1] for _ in range(repeat)) * 1000
+    results = []
+    for module in entry_points:
+        import_ms = min(measure_import(module, repo_dir) for _ in range(repeat))
+        help_ms = None
+        if module in help_entry_points:
+            help_ms = min(run_python(["-m", module, "--help"], repo_dir)[1] for _ in range(repeat)) * 1000
+        results.append({
+            "entry_point": module,
+            "import_ms": round(import_ms, 1),
+            "help_ms": None if help_ms is None else round(help_ms, 1),
+            "heavy": loaded_heavy_modules(module, repo_dir)
+        })
+    return {"python": sys.version.split()[0], "startup_ms": round(startup_ms, 1), "entry_points": results}
+
+
+def check_budget(report, import_budget_ms, help_budget_ms):
+    failures = []
+    for result in report["entry_points"]:
+        if result["heavy"]:
+            failures.append(f"{result['entry_point']}: import 시 무거운 의존성 로드 ({', '.join(result['heavy'])})")
+        if result["import_ms"] > import_budget_ms:
+            failures.append(f"{result['entry_point']}: import {result['import_ms']}ms > 예산 {import_budget_ms}ms")
+        if result["help_ms"] is not None and result["help_ms"] > help_budget_ms:
+            failures.append(f"{result['entry_point']}: --help {result['help_ms']}ms > 예산 {help_budget_ms}ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="실행부별 시작 시간 / import 시간 측정 및 예산 검사")
+    parser.add_argument("--repeat", type=int, default=5, help="실행부별 반복 측정 횟수 (최솟값 사용, 기본값: 5)")
+    parser.add_argument("--import_budget_ms", type=float, default=300, help="entry point import 시간 예산 (기본값: 300ms)")
+    parser.add_argument("--help_budget_ms", type=float, default=1000,
+                        help="--help 실행 시간 예산, interpreter 시작 포함 (기본값: 1000ms)")
+    parser.add_argument("--output", type=str, default=None, help="측정 결과 JSON 저장 경로 (지정 시 저장)")
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = measure(repo_dir, args.repeat)
+    failures = check_budget(report, args.import_budget_ms, args.help_budget_ms)
+    report["failures"] = failures
+
+    print(f"Python {report['python']}, interpreter 시작 {report['startup_ms']:.1f}ms")
+    print(f"{'entry point':<60} {'import':>10} {'--help':>10}  heavy")
+    for result in report["entry_points"]:
+        help_ms = "-" if result["help_ms"] is None else f"{result['help_ms']:.1f}ms"
+        print(f"{result['entry_point']:<60} {result['import_ms']:>8.1f}ms {help_ms:>10}  "
+              f"{', '.join(result['heavy']) or '-'}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for failure in failures:
+        print(f"예산 초과: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.utils import io, instrument
+from src.core.polygon_matching import polygon_matching_algorithm
+from src.core.building_change_detection import detect_building_change
+from src.core.map_validation import create_change_detection_gt
+from src.evaluation import evaluate_building_detection, evaluate_building_change_detection
+from benchmark import synthetic
+
+'''
+합성 데이터 규모별 scaling benchmark
+- 크기별로 synthetic.make_pair로 poly1(수치지도)/poly2(추론 결과)를 만들고
+  algorithm_pipeline과 단계 pipeline 4개(건물 탐지 평가, 변화 탐지 GT, 변화 탐지, 변화 탐지 평가)를 실행
+  (변화 탐지 GT는 poly1 -> poly2, 변화 탐지는 poly1 -> 건물 탐지 평가의 predict를 입력으로 사용)
+- 구간별 시간은 instrument span 기록을 path별로 합산 (index, outer_join, energy, cut, components, metrics ...)
+- peak RSS는 process 전체 최댓값이므로 크기마다 새 process에서 실행
+- 결과는 commit hash와 함께 JSON lines로 누적 -> --compare로 다른 commit의 같은 조건 결과와 비교
+저장소 최상위에서 실행: python -m benchmark.scaling --sizes 1000,10000,100000
+'''
+
+pipeline_spans = ["algorithm_pipeline", "evaluate_bd_pipeline", "change_detection_gt", "detect_building_change",
+                  "evaluate_building_change_detection"]
+
+default_output = "./report/benchmark/scaling.jsonl"
+
+
+def git_commit(repo_dir):
+    # 작업 트리에 commit하지 않은 변경(추적 파일)이 있으면 dirty=True
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status)
+
+
+def relation_counts(gdf):
+    return {rel: int(count) for rel, count in gdf["Relation"].value_counts().sort_index().items()}
+
+
+def summarize_spans(log_path):
+    # path별 wall/CPU 시간 합계와 호출 수, 최상위 span별 종료 시점 peak RSS
+    phases, peak_rss = {}, {}
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            phase = phases.setdefault(record["path"], {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            phase["wall_s"] = round(phase["wall_s"] + record["wall_s"], 4)
+            phase["cpu_s"] = round(phase["cpu_s"] + record["cpu_s"], 4)
+            phase["calls"] += 1
+            if record["depth"] == 0 and record["span"] in pipeline_spans:
+                peak_rss[record["span"]] = record["peak_rss_mb"]
+    return phases, peak_rss
+
+
+def run_case(case):
+    # process worker에서 실행 (크기별 새 process)
+    start_time = time.perf_counter()
+    poly1, poly2, info = synthetic.make_pair(case["size"], case["relation_mix"], case["iou"], case["max_pieces"],
+                                             case["seed"])
+    generate_s = time.perf_counter() - start_time
+    rss_after_generate = instrument.peak_rss_mb()
+    cut, workers = case["cut_threshold"], case["workers"]
+
+    with tempfile.TemporaryDirectory() as out:
+        log_path = os.path.join(out, "spans.jsonl")
+        instrument.configure(log_path, size=case["size"])
+        with instrument.span("algorithm_pipeline"):
+            _, poly1_result, poly2_result = polygon_matching_algorithm.algorithm_pipeline(
+                poly1.copy(), poly2.copy(), out, cut, workers=workers)
+        with instrument.span("evaluate_bd_pipeline"):
+            _, predict = evaluate_building_detection.evaluate_bd_pipeline(
+                poly1.copy(), poly2.copy(), out, out, out, out, cut, case["bd_threshold"], workers=workers,
+                persist=False)
+        with instrument.span("change_detection_gt"):
+            gt_prev, gt_cur = create_change_detection_gt.cd_pipeline(
+                poly1.copy(), poly2.copy(), out, out, out, cut, case["gt_cd_threshold"], workers=workers,
+                persist=False)
+        with instrument.span("detect_building_change"):
+            cd_prev, cd_cur = detect_building_change.cd_pipeline(
+                poly1.copy(), predict, out, out, out, cut, case["cd_threshold"], workers=workers, persist=False)
+        with instrument.span("evaluate_building_change_detection"):
+            evaluate_building_change_detection.cd_evaluate_pipeline(
+                gt_prev, gt_cur, cd_prev, cd_cur, out, out, out, persist=False)
+        io.flush_exports()  # 보고서 CSV 저장 완료 후 임시 디렉토리 삭제
+        instrument.configure(None)
+        phases, peak_rss = summarize_spans(log_path)
+
+    return {
+        **info,
+        "cut_threshold": cut,
+        "workers": workers,
+        "observed_poly1": relation_counts(poly1_result),
+        "observed_poly2": relation_counts(poly2_result),
+        "generate_s": round(generate_s, 4),
+        "pipelines_s": {name: phases[name]["wall_s"] for name in pipeline_spans},
+        "phases": phases,
+        "peak_rss_mb": instrument.peak_rss_mb(),
+        "rss_after_generate_mb": rss_after_generate,
+        "pipeline_peak_rss_mb": peak_rss
+    }
+
+
+def case_key(record):
+    # 같은 조건의 실행끼리 비교
+    return json.dumps([record["num_buildings"], record["relation_mix"], record["iou"], record["max_pieces"],
+                       record["seed"], record["cut_threshold"], record["workers"]], sort_keys=True)
+
+
+def load_records(output_path):
+    if not os.path.exists(output_path):
+        return []
+    with open(output_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latest_by_case(records, commit):
+    # commit 접두어가 일치하는 기록 중 조건별 마지막 기록
+    latest = {}
+    for record in records:
+        if record.get("commit") and record["commit"].startswith(commit):
+            latest[case_key(record)] = record
+    return latest
+
+
+def scaling_exponent(records, name):
+    # 크기 대비 시간의 log-log 기울기 (1이면 선형, 2면 제곱)
+    points = [(math.log(r["num_buildings"]), math.log(r["pipelines_s"][name]))
+              for r in records if r["pipelines_s"].get(name, 0) > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x, 2)
+
+
+def compare(records, base_commit, new_commit, tolerance, min_seconds):
+    # 같은 조건에서 new의 구간 시간 / peak RSS가 base보다 tolerance배 넘게 늘면 회귀
+    base, new = latest_by_case(records, base_commit), latest_by_case(records, new_commit)
+    regressions = []
+    for key in sorted(set(base) & set(new), key=lambda k: json.loads(k)[0]):
+        b, n = base[key], new[key]
+        print(f"\n[{n['num_buildings']} buildings] {b['commit'][:10]} -> {n['commit'][:10]}")
+        rows = [("peak_rss_mb", b["peak_rss_mb"], n["peak_rss_mb"])]
+        rows += [(path, b["phases"][path]["wall_s"], n["phases"][path]["wall_s"])
+                 for path in n["phases"] if path in b["phases"]]
+        for name, old, cur in rows:
+            if not old or not cur:
+                continue
+            ratio = cur / old
+            regressed = ratio > tolerance and (name == "peak_rss_mb" or cur >= min_seconds)
+            print(f"  {name:<70} {old:>10.3f} {cur:>10.3f} {ratio:>6.2f}x{'  회귀' if regressed else ''}")
+            if regressed:
+                regressions.append(f"{n['num_buildings']} {name}: {old:.3f} -> {cur:.3f} ({ratio:.2f}x)")
+    if not set(base) & set(new):
+        print(f"비교할 같은 조건의 기록이 없습니다 ({base_commit} vs {new_commit})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 데이터 규모별 algorithm_pipeline / 단계 pipeline benchmark")
+    parser.add_argument("--sizes", type=str, default="1000,10000,100000",
+                        help="poly1 건물 수 목록 (쉼표 구분, 예: 1000,10000,100000,1000000)")
+    parser.add_argument("--relation_mix", type=str, default=None,
+                        help="관계별 그룹 비율 (예: 1:0=0.05,0:1=0.05,1:1=0.6,1:N=0.1,N:1=0.1,N:N=0.1, 기본값과 동일)")
+    parser.add_argument("--iou", type=str, default="uniform:0.5,1.0",
+                        help="그룹 목표 IoU 분포 (uniform:low,high 또는 beta:a,b, 기본값: uniform:0.5,1.0)")
+    parser.add_argument("--max_pieces", type=int, default=4, help="N쪽 polygon 수 최댓값 (2~max_pieces, 기본값: 4)")
+    parser.add_argument("--seed", type=int, default=0, help="난수 seed (기본값: 0)")
+    parser.add_argument("--cut_threshold", type=float, default=0.05, help="그래프 컷 임계값 (기본값: 0.05)")
+    parser.add_argument("--bd_threshold", type=float, default=0.6, help="탐지 판별 임계값 (기본값: 0.6)")
+    parser.add_argument("--cd_threshold", type=float, default=0.7, help="변화 판별 임계값 (기본값: 0.7)")
+    parser.add_argument("--gt_cd_threshold", type=float, default=0.95, help="GT 변화 판별 임계값 (기본값: 0.95)")
+    parser.add_argument("--workers", type=int, default=1, help="GEOS 연산 병렬 worker 수 (기본값: 1)")
+    parser.add_argument("--output", type=str, default=default_output, help=f"결과 JSON lines 경로 (기본값: {default_output})")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="비교 기준 commit (접두어 가능). 이번 실행(--sizes 생략 시 --against) 결과와 비교")
+    parser.add_argument("--against", type=str, default=None,
+                        help="--compare 대상 commit (지정 시 실행 없이 기록만 비교)")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="회귀로 판단할 시간/메모리 배수 (기본값: 1.25)")
+    parser.add_argument("--min_seconds", type=float, default=0.05,
+                        help="이보다 짧은 구간은 회귀 판단에서 제외 (기본값: 0.05초)")
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commit, dirty = git_commit(repo_dir)
+    records = load_records(args.output)
+
+    if args.against is None:
+        run_records = []
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        for size in sizes:
+            case = {"size": size, "relation_mix": args.relation_mix, "iou": args.iou, "max_pieces": args.max_pieces,
+                    "seed": args.seed, "cut_threshold": args.cut_threshold, "bd_threshold": args.bd_threshold,
+                    "cd_threshold": args.cd_threshold, "gt_cd_threshold": args.gt_cd_threshold,
+                    "workers": args.workers}
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(run_case, case).result()
+            record = {"commit": commit, "dirty": dirty, "run_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      "python": sys.version.split()[0], **result}
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            run_records.append(record)
+            records.append(record)
+
+            pipelines = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in record["pipelines_s"].items())
+            print(f"{size} buildings (poly1 {record['poly1']}, poly2 {record['poly2']}): {pipelines}, "
+                  f"peak RSS {record['peak_rss_mb']}MB")
+            if record["observed_poly1"] != {r: c for r, c in record["expected_poly1"].items() if c}:
+                print(f"  관계 수 차이: expected {record['expected_poly1']}, observed {record['observed_poly1']}")
+
+        if len(run_records) > 1:
+            exponents = {name: scaling_exponent(run_records, name) for name in pipeline_spans}
+            print("scaling 지수 (log 시간 / log 크기): " + ", ".join(f"{k} {v}" for k, v in exponents.items()))
+
+    if args.compare:
+        regressions = compare(records, args.compare, args.against or commit, args.tolerance, args.min_seconds)
+        for regression in regressions:
+            print(f"회귀: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,163 @@
+import numpy as np
+import geopandas as gpd
+import shapely
+
+'''
+benchmark용 합성 건물 polygon 쌍(poly1: 수치지도, poly2: 추론 결과) 생성
+- 관계 그룹 단위로 생성: 1:0, 0:1, 1:1, 1:N, N:1, N:N 그룹 수를 relation_mix 비율로 정확히 지정
+- 그룹마다 목표 IoU t를 iou 분포에서 뽑고, 한쪽 사각형의 높이를 t배로 줄여 그룹 union IoU ≈ t (띠 사이 간격만큼 차이)
+  (N개 쪽은 사각형을 N개 띠로 분할, N:N은 안쪽은 가로 띠/바깥쪽은 세로 띠로 나누어 모든 띠가 연결되도록)
+- 그룹은 격자 칸에 하나씩 떨어뜨려 배치 (그룹 사이 링크 없음), 칸 순서는 섞어서 관계 유형이 공간적으로 섞이도록
+- t가 매우 작으면 띠 링크의 IoU가 cut_threshold보다 작아져 실제 관계가 달라질 수 있으므로
+  benchmark는 생성한 관계 수(expected)와 매칭 결과의 관계 수(observed)를 함께 기록
+- make_previous: poly1에서 일부 삭제/변경한 이전 연도 수치지도 (수치지도 간 비교 단계 입력)
+'''
+
+relations = ["1:0", "0:1", "1:1", "1:N", "N:1", "N:N"]
+
+default_mix = {"1:0": 0.05, "0:1": 0.05, "1:1": 0.6, "1:N": 0.1, "N:1": 0.1, "N:N": 0.1}
+
+# 그룹별 (poly1 수, poly2 수), "N"은 2~max_pieces 중 무작위
+group_shapes = {"1:0": (1, 0), "0:1": (0, 1), "1:1": (1, 1), "1:N": (1, "N"), "N:1": ("N", 1), "N:N": ("N", "N")}
+
+size_range = (8.0, 24.0)  # 건물 사각형 가로/세로 (m)
+gap = 10.0                # 그룹 사이 최소 간격 (m)
+strip_gap = 0.2           # 띠 사이 간격 (m)
+origin = (200000.0, 550000.0)
+crs = 5186
+
+
+def parse_mix(mix):
+    # "1:1=0.6,1:N=0.1,..." 또는 dict, 지정하지 않은 관계는 0, 합이 1이 되도록 정규화
+    if isinstance(mix, str):
+        mix = dict((part.split("=")[0].strip(), float(part.split("=")[1])) for part in mix.split(",") if part.strip())
+    unknown = [key for key in mix if key not in relations]
+    if unknown:
+        raise ValueError(f"Unknown relation: {', '.join(unknown)} ({', '.join(relations)} 중 선택)")
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("relation_mix의 비율 합이 0입니다")
+    return {rel: mix.get(rel, 0.0) / total for rel in relations}
+
+
+def parse_iou(iou):
+    # "uniform:low,high" 또는 "beta:a,b" (beta는 (0, 1] 구간으로 자름)
+    if isinstance(iou, str):
+        name, _, params = iou.partition(":")
+        iou = (name.strip(), *[float(p) for p in params.split(",")])
+    if iou[0] not in ("uniform", "beta"):
+        raise ValueError(f"Unknown iou distribution: {iou[0]} (uniform, beta 중 선택)")
+    return tuple(iou)
+
+
+def sample_iou(rng, iou, size):
+    name, a, b = iou
+    if name == "uniform":
+        values = rng.uniform(a, b, size)
+    else:
+        values = rng.beta(a, b, size)
+    return np.clip(values, 0.01, 1.0)
+
+
+def group_counts(num_buildings, mix, max_pieces):
+    # poly1 건물 수가 num_buildings에 가깝도록 관계별 그룹 수 결정 (N의 기댓값 = (2 + max_pieces) / 2)
+    mean_n = (2 + max_pieces) / 2
+    poly1_per_group = sum(frac * (mean_n if group_shapes[rel][0] == "N" else group_shapes[rel][0])
+                          for rel, frac in mix.items())
+    num_groups = max(1, int(round(num_buildings / max(poly1_per_group, 1e-9))))
+    counts = {rel: int(round(frac * num_groups)) for rel, frac in mix.items()}
+    return counts
+
+
+def strips(cx, cy, w, h, k, horizontal):
+    # 그룹별 사각형 (중심 cx, cy, 크기 w x h)을 k개 띠로 분할 -> 띠별 (xmin, ymin, xmax, ymax)
+    group = np.repeat(np.arange(len(k)), k)
+    j = np.arange(len(group)) - np.repeat(np.cumsum(k) - k, k)
+    k_g = k[group]
+    xmin, ymin = cx[group] - w[group] / 2, cy[group] - h[group] / 2
+    step_x = np.where(horizontal[group], w[group], w[group] / k_g)
+    step_y = np.where(horizontal[group], h[group] / k_g, h[group])
+    x0 = xmin + np.where(horizontal[group], 0, j * step_x)
+    y0 = ymin + np.where(horizontal[group], j * step_y, 0)
+    # 같은 쪽 띠끼리는 strip_gap만큼 띄움 (맞닿은 띠는 상대 쪽 polygon과 면적 0으로 접할 수 있음)
+    pad_x = np.where(~horizontal[group] & (k_g > 1), strip_gap / 2, 0)
+    pad_y = np.where(horizontal[group] & (k_g > 1), strip_gap / 2, 0)
+    return group, (x0 + pad_x, y0 + pad_y, x0 + step_x - pad_x, y0 + step_y - pad_y)
+
+
+def make_pair(num_buildings, relation_mix=None, iou="uniform:0.5,1.0", max_pieces=4, seed=0):
+    '''
+    합성 polygon 쌍 생성
+    반환: poly1, poly2 (GeoDataFrame, EPSG:5186, geometry와 생성 정보 열 syn_group, syn_rel, syn_iou),
+          info (관계별 그룹 수, polygon 수, 사용한 파라미터)
+    '''
+    mix = parse_mix(relation_mix or default_mix)
+    iou = parse_iou(iou)
+    rng = np.random.default_rng(seed)
+    counts = group_counts(num_buildings, mix, max_pieces)
+
+    rel = np.repeat(np.array(relations), [counts[r] for r in relations])
+    num_groups = len(rel)
+    n1 = np.zeros(num_groups, dtype=np.int64)
+    n2 = np.zeros(num_groups, dtype=np.int64)
+    for r, (k1, k2) in group_shapes.items():
+        mask = rel == r
+        n1[mask] = rng.integers(2, max_pieces + 1, mask.sum()) if k1 == "N" else k1
+        n2[mask] = rng.integers(2, max_pieces + 1, mask.sum()) if k2 == "N" else k2
+
+    # 격자 칸 배치 (칸 순서를 섞어서 관계 유형이 섞이도록)
+    pitch = size_range[1] + gap
+    cols = int(np.ceil(np.sqrt(max(num_groups, 1))))
+    cell = rng.permutation(num_groups)
+    cx = origin[0] + (cell % cols) * pitch
+    cy = origin[1] + (cell // cols) * pitch
+    w = rng.uniform(*size_range, num_groups)
+    h = rng.uniform(*size_range, num_groups)
+    t = np.where((n1 > 0) & (n2 > 0), sample_iou(rng, iou, num_groups), np.nan)
+
+    # 한쪽(inner)의 높이만 t배 -> 같은 중심, 같은 폭이므로 두 쪽 union의 IoU ≈ t
+    inner1 = rng.random(num_groups) < 0.5
+    h1 = np.where(inner1 & ~np.isnan(t), h * np.nan_to_num(t, nan=1.0), h)
+    h2 = np.where(~inner1 & ~np.isnan(t), h * np.nan_to_num(t, nan=1.0), h)
+    # N:N은 안쪽을 가로 띠, 바깥쪽을 세로 띠로 나눠야 모든 띠가 상대 쪽 띠와 겹침 (나머지는 세로 띠)
+    is_nn = rel == "N:N"
+
+    def side(n, hh, horizontal):
+        group, bounds = strips(cx, cy, w, hh, n, horizontal)
+        gdf = gpd.GeoDataFrame({
+            "syn_group": group,
+            "syn_rel": rel[group],
+            "syn_iou": t[group]
+        }, geometry=shapely.box(*bounds), crs=crs)
+        # 파일 순서도 그룹 순서와 무관하도록 섞기
+        return gdf.iloc[rng.permutation(len(gdf))].reset_index(drop=True)
+
+    poly1 = side(n1, h1, is_nn & inner1)
+    poly2 = side(n2, h2, is_nn & ~inner1)
+
+    info = {
+        "num_buildings": int(num_buildings),
+        "seed": int(seed),
+        "relation_mix": {r: round(mix[r], 6) for r in relations},
+        "iou": list(iou),
+        "max_pieces": int(max_pieces),
+        "groups": {r: counts[r] for r in relations},
+        "poly1": len(poly1),
+        "poly2": len(poly2),
+        "expected_poly1": {r: int(n1[rel == r].sum()) for r in relations},
+        "expected_poly2": {r: int(n2[rel == r].sum()) for r in relations}
+    }
+    return poly1, poly2, info
+
+
+def make_previous(poly, removed=0.05, changed=0.1, seed=0):
+    # 이전 연도 수치지도: poly에서 removed 비율은 삭제(신축), changed 비율은 높이를 0.5~0.9배로 변경(갱신),
+    # 나머지는 같은 도형 (합성 건물은 모두 축에 평행한 사각형이므로 bounds로 다시 생성)
+    rng = np.random.default_rng(seed)
+    keep = rng.random(len(poly)) >= removed
+    previous = poly[keep].reset_index(drop=True)
+    xmin, ymin, xmax, ymax = shapely.bounds(np.asarray(previous.geometry.values)).T
+    factor = np.where(rng.random(len(previous)) < changed, rng.uniform(0.5, 0.9, len(previous)), 1.0)
+    cy, h = (ymin + ymax) / 2, (ymax - ymin) * factor
+    geometry = np.where(factor < 1.0, shapely.box(xmin, cy - h / 2, xmax, cy + h / 2), previous.geometry.values)
+    return gpd.GeoDataFrame(previous.drop(columns=previous.geometry.name), geometry=geometry, crs=poly.crs)
@@ -1,31 +1,14 @@
-import geopandas as gpd
 import os
+from src.utils import io
 
 '''
-1. import_shapefiles: 두 개의 Shapefile을 불러와 좌표계를 맞춤
-2. remove_small_areas: 지정된 면적보다 작은 폴리곤을 제거
-3. remove_high_overlap_buildings: 이전 맵과 현재 맵에서 70% 이상 겹치는 건물 제거
-4. export_shapefile: 결과를 Shapefile로 저장
-5. refine_digital_map_current_pipeline: 전체 파이프라인, 위의 모든 단계를 실행하고 결과를 저장
+1. remove_small_areas: 지정된 면적보다 작은 폴리곤을 제거
+2. remove_high_overlap_buildings: 이전 맵과 현재 맵에서 70% 이상 겹치는 건물 제거
+3. export_shapefile: 결과를 Shapefile로 저장
+4. refine_digital_map_current_pipeline: 전체 파이프라인, 위의 모든 단계를 실행하고 결과를 저장
+(Shapefile 불러오기와 좌표계 맞추기는 src.utils.io.import_shapefile 사용)
 '''
 
-def import_shapefiles(prev_map_path, cur_map_path):
-    """
-    두 개의 Shapefile을 불러오는 함수.
-
-    Args:
-    - prev_map_path: 이전 원시 디지털 맵 파일 경로 (previous raw digital map)
-    - cur_map_path: 수동으로 분류된 디지털 맵 파일 경로 (manually categorized digital map)
-
-    Returns:
-    - Tuple[GeoDataFrame, GeoDataFrame]: 두 개의 GeoDataFrame
-    """
-    prev_map = gpd.read_file(prev_map_path)
-    cur_map = gpd.read_file(cur_map_path)
-    prev_map = prev_map.to_crs(epsg=5186)
-    cur_map = cur_map.to_crs(epsg=5186)
-    return prev_map, cur_map
-
 def remove_small_areas(gdf, max_area):
     """
     주어진 최소 면적보다 작은 폴리곤을 제거하는 함수.
@@ -113,7 +96,8 @@ def refine_digital_map_current_pipeline(prev_map_path, cur_map_path, output_dir,
     - None
     """
     # 1. Shapefile 불러오기
-    prev_map, cur_map = import_shapefiles(prev_map_path, cur_map_path)
+    prev_map = io.import_shapefile(prev_map_path, crs=5186)
+    cur_map = io.import_shapefile(cur_map_path, crs=5186)
 
     # 2. 면적 기준으로 제거
     prev_map = remove_small_areas(prev_map, max_area)
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from src.common import path_config
+from src.main import run_pipeline, default_thresholds
+from src.utils import io, parallel
+
+'''
+입력 프롬프트 없이 여러 지역을 한 번에 실행하는 batch 실행부 (야간 서버 실행용)
+- 지역별 run_pipeline을 process pool에서 동시에 실행 (전체 시간 ≈ 가장 오래 걸리는 지역)
+- 옵션은 명령행 인자 또는 job 파일(JSON, 인자와 같은 key)로 지정, 둘 다 주면 명령행 인자 우선
+- 실행 결과(지역별 성공 여부, 단계별 소요 시간, 오류 traceback)는 JSON 요약 파일로 저장
+'''
+
+step_names = ["Evaluate Building Detection", "Detect Change", "Evaluate Change Detection", "Dmap vs Dmap"]
+
+job_defaults = {
+    "regions": "all",
+    "year": "2022",
+    "previous_year": "2020",
+    "steps": "1,2,3,4",
+    "workers": -1,
+    "summary": None,
+    "force": False,
+    "instrument_dir": None,
+    "profile_span": None
+}
+
+
+def run_region(job):
+    # process worker에서 실행
+    start_time = time.time()
+    result = {"region": job["region"], "status": "ok", "steps": [], "error": None}
+    try:
+        result["steps"] = run_pipeline(job["region"], job["year"], job["previous_year"],
+                                       job["selected_indices"], job["thresholds"], job["force"],
+                                       job["instrument_log"], job["profile_span"])
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc()
+    finally:
+        # 실패한 지역도 제출된 저장을 끝내야 다음 지역에 이 지역의 저장 오류가 넘어가지 않음 (저장 오류는 이 지역의 실패로 기록)
+        try:
+            io.flush_exports()
+        except Exception:
+            result["status"] = "error"
+            result["error"] = (result["error"] or "") + traceback.format_exc()
+    result["seconds"] = round(time.time() - start_time, 3)
+    return result
+
+
+def parse_regions(regions):
+    if regions == "all":
+        return list(path_config.regions)
+    regions = [r.strip() for r in regions.split(",") if r.strip()]
+    unknown = [r for r in regions if r not in path_config.regions]
+    if unknown:
+        raise ValueError(f"Unknown region: {', '.join(unknown)} ({', '.join(path_config.regions)} 중 선택)")
+    return regions
+
+
+def parse_steps(steps):
+    indices = [int(s) - 1 for s in str(steps).split(",") if s.strip()]
+    invalid = [i + 1 for i in indices if not 0 <= i < len(step_names)]
+    if invalid:
+        raise ValueError(f"Unknown step: {invalid} (1-{len(step_names)} 중 선택)")
+    return indices
+
+
+def load_job(args):
+    # job 파일 → 명령행 인자 순으로 덮어쓰기 (지정하지 않은 인자는 None)
+    job = dict(job_defaults)
+    thresholds = dict(default_thresholds)
+    if args.job:
+        with open(args.job, "r", encoding="utf-8") as f:
+            job_file = json.load(f)
+        thresholds.update(job_file.pop("thresholds", {}))
+        job.update(job_file)
+
+    for key, value in vars(args).items():
+        if value is None or key == "job":
+            continue
+        if key in thresholds:
+            thresholds[key] = value
+        else:
+            job[key] = value
+
+    unknown = [key for key in thresholds if key not in default_thresholds]
+    if unknown:
+        raise ValueError(f"Unknown threshold: {', '.join(unknown)} ({', '.join(default_thresholds)} 중 선택)")
+    job["thresholds"] = thresholds
+    return job
+
+
+def run_batch(job):
+    regions = parse_regions(job["regions"])
+    selected_indices = parse_steps(job["steps"])
+    workers = min(parallel.resolve_workers(job["workers"]), len(regions))
+    region_jobs = [{
+        "region": region,
+        "year": str(job["year"]),
+        "previous_year": str(job["previous_year"]),
+        "selected_indices": selected_indices,
+        "thresholds": job["thresholds"],
+        "force": bool(job["force"])
+    } for region in regions]
+
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for region_job in region_jobs:
+        # 계측 기록은 지역별 파일 (<instrument_dir>/<시작 시각>_<지역>.jsonl)
+        region_job["instrument_log"] = os.path.join(
+            job["instrument_dir"], f"{started_at.replace(':', '').replace('-', '')}_{region_job['region']}.jsonl"
+        ) if job["instrument_dir"] else None
+        region_job["profile_span"] = job["profile_span"]
+    start_time = time.time()
+    if workers == 1:
+        results = [run_region(region_job) for region_job in region_jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_region, region_jobs))
+
+    return {
+        "started_at": started_at,
+        "seconds": round(time.time() - start_time, 3),
+        "workers": workers,
+        "year": str(job["year"]),
+        "previous_year": str(job["previous_year"]),
+        "steps": [step_names[i] for i in selected_indices],
+        "thresholds": job["thresholds"],
+        "num_failed": sum(result["status"] != "ok" for result in results),
+        "regions": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="전체 파이프라인 batch 실행 (입력 프롬프트 없음)")
+    parser.add_argument("--job", type=str, default=None, help="job 파일 (JSON, 아래 옵션과 같은 key, 임계값은 thresholds 아래)")
+    parser.add_argument("--regions", type=str, default=None, help="지역 목록 (예: suseo,mapo, 기본값: all)")
+    parser.add_argument("--year", type=str, default=None, help="기준 연도 (기본값: 2022)")
+    parser.add_argument("--previous_year", type=str, default=None, help="이전 연도 (기본값: 2020)")
+    parser.add_argument("--steps", type=str, default=None,
+                        help="실행할 단계 번호 (1: Evaluate Building Detection, 2: Detect Change, "
+                             "3: Evaluate Change Detection, 4: Dmap vs Dmap, 기본값: 1,2,3,4)")
+    parser.add_argument("--workers", type=int, default=None, help="동시에 실행할 지역 process 수 (-1: CPU 코어 수, 기본값)")
+    parser.add_argument("--force", action="store_true", default=None,
+                        help="입력과 파라미터가 마지막 성공 실행과 같아도 선택한 단계 모두 실행")
+    parser.add_argument("--instrument_dir", type=str, default=None,
+                        help="구간별 계측(wall/CPU 시간, peak RSS, 건수) JSON lines 저장 디렉토리 (지정 시 계측)")
+    parser.add_argument("--profile_span", type=str, default=None,
+                        help="cProfile로 실행할 구간 이름 (예: energy, best_subset, Detect Change)")
+    parser.add_argument("--summary", type=str, default=None,
+                        help="실행 요약 JSON 경로 (기본값: ./report/batch/run_<시작 시각>.json)")
+    parser.add_argument("--bd_cut_threshold", type=float, default=None, help="건물 탐지 평가 그래프 컷 임계값 (기본값: 0.05)")
+    parser.add_argument("--bd_threshold", type=float, default=None, help="탐지 판별 임계값 (기본값: 0.6)")
+    parser.add_argument("--cd_cut_threshold", type=float, default=None, help="변화 탐지 그래프 컷 임계값 (기본값: 0.05)")
+    parser.add_argument("--cd_threshold", type=float, default=None, help="변화 판별 임계값 (기본값: 0.7)")
+    parser.add_argument("--gt_cut_threshold", type=float, default=None, help="변화 탐지 GT 그래프 컷 임계값 (기본값: 0.05)")
+    parser.add_argument("--gt_cd_threshold", type=float, default=None, help="변화 탐지 GT 변화 판별 임계값 (기본값: 0.95)")
+
+    args = parser.parse_args()
+
+    job = load_job(args)
+    summary = run_batch(job)
+
+    summary_path = job["summary"] or os.path.join(
+        "report", "batch", f"run_{summary['started_at'].replace(':', '').replace('-', '')}.json")
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    for result in summary["regions"]:
+        print(f"{result['region']}: {result['status']} ({result['seconds']:.2f}초)")
+    print(f"전체 {summary['seconds']:.2f}초, 실패 {summary['num_failed']}개 지역, 요약: {summary_path}")
+    return 1 if summary["num_failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
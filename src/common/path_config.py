@@ -48,6 +48,11 @@ def load_paths(region, year, previous_year):
     return paths
 
 
+# 지역/연도와 무관한 경로(캐시 등) 하나를 불러옴
+def load_common_path(key):
+    return load_paths(region="", year="", previous_year="")[key]
+
+
 # 지역을 선택하는 함수 (이전 값이 있으면 기본값으로 사용)
 def select_region():
     """
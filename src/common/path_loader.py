@@ -21,3 +21,14 @@ def load_building_paths(region, year, previous_year):
             paths[key] = os.path.normpath(os.path.join(base_dir, rel_path))
 
     return paths
+
+
+def load_artifact_format():
+    # 단계 사이 중간 산출물 저장 형식 (config.json의 artifact_format, 기본값: shapefile)
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    config_path = os.path.join(base_dir, 'config', 'config.json')
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    return config.get('artifact_format', 'shapefile')
@@ -1,3 +1,12 @@
+import os
+import json
+import time
+import contextvars
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from src.utils import io, cache, instrument
+
+
 def get_selected_pipeline_indices(pipeline_steps):
     """
     사용자로부터 실행할 pipeline 인덱스를 받아 리스트로 리턴
@@ -16,11 +25,130 @@ def get_selected_pipeline_indices(pipeline_steps):
 
 def run_selected_pipeline_steps(pipeline_steps, selected_indices):
     """
-    인덱스 리스트에 따라 지정된 단계 실행
+    인덱스 리스트에 따라 지정된 단계 실행, 실행한 단계별 소요 시간(초)을 리스트로 리턴
     """
+    step_times = []
     for idx in selected_indices:
         if 0 <= idx < len(pipeline_steps):
-            _, func = pipeline_steps[idx]
+            description, func = pipeline_steps[idx]
+            start_time = time.time()
             func()
+            step_times.append({"step": description, "seconds": round(time.time() - start_time, 3)})
         else:
-            print(f"{idx + 1}번 인덱스는 유효하지 않습니다.")
\ No newline at end of file
+            print(f"{idx + 1}번 인덱스는 유효하지 않습니다.")
+    return step_times
+
+
+def step_dependencies(steps):
+    """
+    단계별 선행 단계 인덱스 집합 (다른 단계가 쓰는 경로 key를 읽는 단계는 그 단계 뒤에 실행)
+    """
+    dependencies = {}
+    for i, step in steps.items():
+        dependencies[i] = {j for j, other in steps.items()
+                           if j != i and set(other["outputs"]) & set(step["inputs"])}
+    return dependencies
+
+
+def fingerprint_inputs(step, paths):
+    return {key: cache.fingerprint_file(paths[key]) if os.path.exists(paths[key]) else None
+            for key in step["inputs"]}
+
+
+def is_up_to_date(step, paths, state):
+    """
+    마지막 성공 실행과 입력 파일 지문, 파라미터가 같고 출력 경로가 모두 있으면 최신
+    """
+    last = state.get(step["name"])
+    if last is None or last["params"] != json.loads(json.dumps(step["params"])):
+        return False
+    if any(not os.path.isdir(paths[key]) or not os.listdir(paths[key]) for key in step["outputs"]):
+        return False
+    return last["inputs"] == fingerprint_inputs(step, paths)
+
+
+def record_state(state_path, state, done_steps, paths):
+    """
+    성공한 단계의 입력 지문 기록 (결과 파일 저장이 끝난 뒤 호출)
+    """
+    for step in done_steps:
+        state[step["name"]] = {"inputs": fingerprint_inputs(step, paths), "params": step["params"]}
+
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = f"{state_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def run_pipeline_dag(pipeline_steps, selected_indices, paths, state_path, workers=None, force=False):
+    """
+    make처럼 의존 관계에 따라 선택한 단계 실행
+    - pipeline_steps: {"name", "func", "inputs", "outputs", "params"} 리스트 (inputs, outputs는 config.json 경로 key)
+    - 선행 단계가 모두 끝난 단계부터 실행, 서로 의존하지 않는 단계는 동시에 실행
+    - 이번 실행에서 선행 단계가 실행되지 않았고 입력 지문, 파라미터가 마지막 성공 실행과 같으면 생략 (force=True면 항상 실행)
+    - 단계별 소요 시간과 실행/생략 여부를 리스트로 리턴
+    """
+    steps = {}
+    for idx in selected_indices:
+        if 0 <= idx < len(pipeline_steps):
+            steps[idx] = pipeline_steps[idx]
+        else:
+            print(f"{idx + 1}번 인덱스는 유효하지 않습니다.")
+    dependencies = step_dependencies(steps)
+
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+    step_times = {}
+    ran = set()
+    done_steps = []
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers or max(1, len(steps))) as executor:
+        try:
+            while len(step_times) < len(steps):
+                ready = [i for i in steps if i not in step_times and i not in running.values()
+                         and all(j in step_times for j in dependencies[i])]
+                if not ready and not running:
+                    raise ValueError(f"순환 의존 관계: {[steps[i]['name'] for i in steps if i not in step_times]}")
+
+                for i in ready:
+                    step = steps[i]
+                    if not force and not (dependencies[i] & ran) and is_up_to_date(step, paths, state):
+                        print(f"{step['name']} - 입력과 파라미터 변경 없음, 생략")
+                        step_times[i] = {"step": step["name"], "seconds": 0.0, "status": "skipped"}
+                        continue
+                    # 계측 설정(instrument)이 단계 스레드에도 적용되도록 현재 context에서 실행
+                    running[executor.submit(contextvars.copy_context().run, timed_call, step)] = i
+
+                if not running:
+                    continue
+                finished, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    seconds = future.result()
+                    ran.add(i)
+                    done_steps.append(steps[i])
+                    step_times[i] = {"step": steps[i]["name"], "seconds": seconds, "status": "ran"}
+        finally:
+            # 실패한 단계가 있어도 이미 성공한 단계는 기록 (결과 파일 저장이 끝난 뒤)
+            for future in running:
+                future.cancel()
+            futures.wait(running)
+            for future, i in running.items():
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    done_steps.append(steps[i])
+            if done_steps:
+                # 기록이 끝난 뒤 반환해야 같은 process의 다음 실행이 갱신된 상태를 읽음 (기록 오류는 flush_exports에서 raise)
+                futures.wait([io.after_exports(record_state, state_path, state, done_steps, paths)])
+
+    return [step_times[i] for i in selected_indices if i in step_times]
+
+
+def timed_call(step):
+    start_time = time.time()
+    with instrument.span(step["name"]):
+        step["func"]()
+    return round(time.time() - start_time, 3)
@@ -1,5 +1,5 @@
 import argparse
-from src.utils import io
+from src.utils import io, instrument
 from src.utils import analysis_utils
 from src.core.polygon_matching import polygon_matching_utils, polygon_matching_algorithm
 from src.common.path_loader import load_building_paths
@@ -12,18 +12,23 @@ def assign_class(poly, threshold):
     return poly
 
 
-def cd_pipeline(dmap_path, seg_path, dmap_output_path, seg_output_path, anl_output_path, cut_threshold, cd_threshold):
+def cd_pipeline(dmap_path, seg_path, dmap_output_path, seg_output_path, anl_output_path, cut_threshold, cd_threshold, tile_size=None, workers=1, cache_dir=None, matching="union", persist=True):
+    # dmap_path, seg_path: 파일 경로 또는 GeoDataFrame, persist=False: dmap/seg는 저장하지 않고 반환만
     _, dmap, seg = (polygon_matching_algorithm.algorithm_pipeline
-                          (dmap_path, seg_path, anl_output_path, cut_threshold))
-    dmap = assign_class(dmap, cd_threshold)
-    seg = assign_class(seg, cd_threshold)
-    dmap = polygon_matching_utils.bd_result_attach(dmap, seg)
+                          (dmap_path, seg_path, anl_output_path, cut_threshold, tile_size, workers, cache_dir,
+                           matching=matching))
+    with instrument.span("classify", rows1=len(dmap), rows2=len(seg)):
+        dmap = assign_class(dmap, cd_threshold)
+        seg = assign_class(seg, cd_threshold)
+        dmap = polygon_matching_utils.bd_result_attach(dmap, seg)
     dmap = dmap.rename(columns={"Relation": "rel_cd"})
     seg = seg.rename(columns={"Relation": "rel_cd"})
     report = analysis_utils.analysis_pipeline(dmap, seg)
-    io.export_file(dmap, dmap_output_path, 'dmap')
-    io.export_file(seg, seg_output_path, 'seg')
+    if persist:
+        io.export_file(dmap, dmap_output_path, 'dmap')
+        io.export_file(seg, seg_output_path, 'seg')
     io.export_file(report, anl_output_path, 'analysis_result')
+    return dmap, seg
 
 
 def main():
@@ -33,6 +38,11 @@ def main():
     parser.add_argument("--previous_year", type=str, default=2020, help="이전 연도")
     parser.add_argument("--cut_threshold", type=float, default=0.05, help="그래프 컷 임계값")
     parser.add_argument("--cd_threshold", type=float, default=0.7, help="변화 판별 임계값")
+    parser.add_argument("--tile_size", type=float, default=None, help="타일 크기 (m, 지정 시 타일 단위 매칭)")
+    parser.add_argument("--workers", type=int, default=1, help="병렬 worker 수 (-1: CPU 코어 수)")
+    parser.add_argument("--use_cache", action="store_true", help="매칭 결과 캐시 사용 (config의 matching_cache 경로)")
+    parser.add_argument("--matching", type=str, default="union", choices=["union", "assignment"],
+                        help="매칭 방식 (assignment: 링크 IoU 기준 1:1 매칭 상대 match_idx, match_iou 추가)")
 
     args = parser.parse_args()
 
@@ -45,8 +55,13 @@ def main():
         seg_output_path=paths["building_change_detection_result_cur"],
         anl_output_path=paths["building_change_detection_result_anl"],
         cut_threshold=args.cut_threshold,
-        cd_threshold=args.cd_threshold
+        cd_threshold=args.cd_threshold,
+        tile_size=args.tile_size,
+        workers=args.workers,
+        cache_dir=paths["matching_cache"] if args.use_cache else None,
+        matching=args.matching
     )
+    io.flush_exports()
 
 
 if __name__ == "__main__":
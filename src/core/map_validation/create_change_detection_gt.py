@@ -1,7 +1,7 @@
 import argparse
-from src.utils import io, analysis_utils
+from src.utils import io, analysis_utils, instrument
 from src.core.polygon_matching import polygon_matching_utils, polygon_matching_algorithm
-from src.common.path_loader import load_building_paths
+from src.common.path_loader import load_building_paths, load_artifact_format
 
 
 def assign_class(poly, threshold):
@@ -11,24 +11,32 @@ def assign_class(poly, threshold):
     return poly
 
 
-def cd_pipeline(dmap1_path, dmap2_path, prev_output_path, cur_output_path, anl_output_path, cut_threshold, cd_threshold):
+def cd_pipeline(dmap1_path, dmap2_path, prev_output_path, cur_output_path, anl_output_path, cut_threshold, cd_threshold, tile_size=None, workers=1, cache_dir=None, snap_precision=None, matching="union", artifact_format="shapefile", persist=True):
+    # dmap1_path, dmap2_path: 파일 경로 또는 GeoDataFrame, persist=False: prev/cur는 저장하지 않고 반환만
+    # 수치지도 간 비교: 변경되지 않은 건물(같은 도형)은 overlay 없이 IoU 1로 처리
     _, dmap1, dmap2 = (polygon_matching_algorithm.algorithm_pipeline
-                             (dmap1_path, dmap2_path, anl_output_path, cut_threshold))
-    dmap1 = assign_class(dmap1, cd_threshold)
-    dmap2 = assign_class(dmap2, cd_threshold)
+                             (dmap1_path, dmap2_path, anl_output_path, cut_threshold, tile_size, workers, cache_dir,
+                              identical=True, snap_precision=snap_precision, matching=matching))
+    with instrument.span("classify", rows1=len(dmap1), rows2=len(dmap2)):
+        dmap1 = assign_class(dmap1, cd_threshold)
+        dmap2 = assign_class(dmap2, cd_threshold)
     report = analysis_utils.analysis_pipeline(dmap1, dmap2)
     cols_to_drop = [
         'iou_nn', 'ol_pl1_nn', 'ol_pl2_nn',
         'iou_1n', 'ol_pl1_1n', 'ol_pl2_1n',
         'iou_n1', 'ol_pl1_n1', 'ol_pl2_n1',
         'iou_11', 'ol_pl1_11', 'ol_pl2_11',
+        'iou_bs', 'ol_pl1_bs', 'ol_pl2_bs', 'in_bs',
         'comp_idx', 'poly1_set', 'poly2_set', 'cut_link', 'Relation'
     ]
     dmap1 = dmap1.drop(columns=[col for col in cols_to_drop if col in dmap1.columns])
     dmap2 = dmap2.drop(columns=[col for col in cols_to_drop if col in dmap2.columns])
-    io.export_file(dmap1, prev_output_path, 'prev_dmap_add_error')
-    io.export_file(dmap2, cur_output_path, 'cur_dmap_add_error')
+    # 변화 탐지 GT는 Evaluate Change Detection이 읽는 중간 산출물
+    if persist:
+        io.export_file(dmap1, prev_output_path, 'prev_dmap_add_error', artifact_format)
+        io.export_file(dmap2, cur_output_path, 'cur_dmap_add_error', artifact_format)
     io.export_file(report, anl_output_path, 'analysis_result')
+    return dmap1, dmap2
 
 
 def main():
@@ -38,6 +46,12 @@ def main():
     parser.add_argument("--previous_year", type=str, default=2020, help="이전 연도")
     parser.add_argument("--cut_threshold", type=float, default=0.05, help="그래프 컷 임계값")
     parser.add_argument("--cd_threshold", type=float, default=0.95, help="변화 판별 임계값")
+    parser.add_argument("--tile_size", type=float, default=None, help="타일 크기 (m, 지정 시 타일 단위 매칭)")
+    parser.add_argument("--workers", type=int, default=1, help="병렬 worker 수 (-1: CPU 코어 수)")
+    parser.add_argument("--use_cache", action="store_true", help="매칭 결과 캐시 사용 (config의 matching_cache 경로)")
+    parser.add_argument("--matching", type=str, default="union", choices=["union", "assignment"],
+                        help="매칭 방식 (assignment: 링크 IoU 기준 1:1 매칭 상대 match_idx, match_iou 추가)")
+    parser.add_argument("--snap_precision", type=float, default=None, help="동일 도형 판별 시 좌표 스냅 격자 크기 (m, 기본값: 스냅 없음)")
 
     args = parser.parse_args()
 
@@ -50,8 +64,15 @@ def main():
         cur_output_path=paths["GT_of_building_change_detection_cur"],
         anl_output_path=paths["GT_of_building_change_detection_anl"],
         cut_threshold=args.cut_threshold,
-        cd_threshold=args.cd_threshold
+        cd_threshold=args.cd_threshold,
+        tile_size=args.tile_size,
+        workers=args.workers,
+        cache_dir=paths["matching_cache"] if args.use_cache else None,
+        snap_precision=args.snap_precision,
+        matching=args.matching,
+        artifact_format=load_artifact_format()
     )
+    io.flush_exports()
 
 
 if __name__ == "__main__":
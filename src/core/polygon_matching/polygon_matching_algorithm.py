@@ -1,14 +1,32 @@
-import networkx as nx
 from src.core.polygon_matching import polygon_matching_utils
-from src.utils import io
+from src.utils import io, cache, parallel, instrument
+from src.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+gpd = lazy_import("geopandas")
+shapely = lazy_import("shapely")
+
+# 매칭 결과가 달라지는 변경 시 올려서 기존 캐시 무효화
+MATCHING_CACHE_VERSION = 2
 
 
 # index to shapefile
 def indexing(poly1, poly2):
-    poly1['poly1_idx'] = range(1, len(poly1) + 1)
+    with instrument.span("index", rows1=len(poly1), rows2=len(poly2)):
+        poly1, poly2 = add_index_columns(poly1, poly2)
+    with instrument.span("outer_join") as counts:
+        outer_joined = polygon_matching_utils.outer_join_idx(poly1, poly2, poly1_prefix="poly1", poly2_prefix="poly2")
+        counts["rows"] = len(outer_joined)
+    return poly1, poly2, outer_joined
+
+
+def add_index_columns(poly1, poly2, ids1=None, ids2=None):
+    # ids1, ids2: 타일 단위로 읽은 행의 전체 기준 poly_idx (None이면 1부터 행 순서)
+    poly1['poly1_idx'] = range(1, len(poly1) + 1) if ids1 is None else ids1
     poly1 = poly1.reset_index(drop=True)
 
-    poly2['poly2_idx'] = range(1, len(poly2) + 1)
+    poly2['poly2_idx'] = range(1, len(poly2) + 1) if ids2 is None else ids2
     poly2 = poly2.reset_index(drop=True)
 
     poly1_area = poly1.geometry.area
@@ -21,147 +39,375 @@ def indexing(poly1, poly2):
     poly2 = poly2.drop(columns=['area'], errors='ignore')
     idx_loc2 = poly2.columns.get_loc('poly2_idx')
     poly2.insert(loc=idx_loc2, column='area', value=poly2_area)
-
-    outer_joined = polygon_matching_utils.outer_join(poly1, poly2, poly1_prefix="poly1", poly2_prefix="poly2")
-    return poly1, poly2, outer_joined
+    return poly1, poly2
 
 
 def build_graph(joined_df):
-    nodes = set()
-    links = []
-
-    for _, row in joined_df.dropna(subset=["poly1_idx", "poly2_idx"]).iterrows():
-        p1 = f"p1_{int(row['poly1_idx'])}"
-        p2 = f"p2_{int(row['poly2_idx'])}"
-        links.append({"source": p1, "target": p2})
-        nodes.update([p1, p2])
-
-    if "poly1_idx" in joined_df.columns:
-        for p1 in joined_df["poly1_idx"].dropna().unique():
-            nodes.add(f"p1_{int(p1)}")
-    if "poly2_idx" in joined_df.columns:
-        for p2 in joined_df["poly2_idx"].dropna().unique():
-            nodes.add(f"p2_{int(p2)}")
-
-    node_list = [{"id": n} for n in sorted(nodes)]
-
-    return {"nodes": node_list, "links": links}
-
-
-def add_energy_to_links(poly1, poly2, graph_dict):
-    poly1 = poly1.set_index("poly1_idx")
-    poly2 = poly2.set_index("poly2_idx")
-
-    for link in graph_dict["links"]:
-        p1_idx = int(link["source"].replace("p1_", ""))
-        p2_idx = int(link["target"].replace("p2_", ""))
-
-        if p1_idx not in poly1.index or p2_idx not in poly2.index:
-            raise ValueError(f"Missing poly1_idx {p1_idx} or poly2_idx {p2_idx} in geometry.")
-
-        geom1 = poly1.loc[p1_idx, "geometry"]
-        geom2 = poly2.loc[p2_idx, "geometry"]
-
-        if geom1.is_empty or geom2.is_empty:
-            raise ValueError(f"Empty geometry at poly1_idx {p1_idx} or poly2_idx {p2_idx}.")
-
-        intersection = geom1.intersection(geom2)
-        union = geom1.union(geom2)
-
-        if union.area == 0 or intersection.area == 0:
-            raise ValueError(f"No valid overlap between {p1_idx} and {p2_idx}.")
-
-        link["energy"] = intersection.area / union.area
-
-    return graph_dict
-
+    poly1_ids = np.sort(joined_df["poly1_idx"].dropna().unique().astype(np.int64)) \
+        if "poly1_idx" in joined_df.columns else np.empty(0, dtype=np.int64)
+    poly2_ids = np.sort(joined_df["poly2_idx"].dropna().unique().astype(np.int64)) \
+        if "poly2_idx" in joined_df.columns else np.empty(0, dtype=np.int64)
+
+    linked = joined_df.dropna(subset=["poly1_idx", "poly2_idx"])
+    links = pd.DataFrame({
+        "poly1_idx": linked["poly1_idx"].to_numpy(dtype=np.int64),
+        "poly2_idx": linked["poly2_idx"].to_numpy(dtype=np.int64)
+    })
+
+    # 노드 번호: poly1은 [0, n1), poly2는 [n1, n1 + n2)
+    links["source"] = np.searchsorted(poly1_ids, links["poly1_idx"].to_numpy())
+    links["target"] = len(poly1_ids) + np.searchsorted(poly2_ids, links["poly2_idx"].to_numpy())
+
+    return {"poly1_ids": poly1_ids, "poly2_ids": poly2_ids, "links": links}
+
+
+def build_tiled_graph(poly1_path, poly2_path, tile_size, workers=1, prune_threshold=None,
+                      identical=False, snap_precision=None):
+    # poly1 bbox 중심이 속한 타일이 해당 poly1의 링크를 담당 (링크는 정확히 한 타일에서만 계산)
+    # 반환 graph의 node_tile: 노드별 bbox 중심이 속한 타일 번호 (poly2도 같은 격자, metric 계산 타일 배정용)
+    fids1, bounds1 = io.read_bounds(poly1_path)
+    fids2, bounds2 = io.read_bounds(poly2_path)
+    poly1_ids = np.arange(1, len(fids1) + 1, dtype=np.int64)
+    poly2_ids = np.arange(1, len(fids2) + 1, dtype=np.int64)
+
+    center_x = np.nan_to_num((bounds1[0] + bounds1[2]) / 2)
+    center_y = np.nan_to_num((bounds1[1] + bounds1[3]) / 2)
+    origin_x = center_x.min() if len(center_x) > 0 else 0
+    origin_y = center_y.min() if len(center_y) > 0 else 0
+    center_x = np.concatenate([center_x, np.nan_to_num((bounds2[0] + bounds2[2]) / 2)])
+    center_y = np.concatenate([center_y, np.nan_to_num((bounds2[1] + bounds2[3]) / 2)])
+    tile_xy = np.stack([np.floor((center_x - origin_x) / tile_size),
+                        np.floor((center_y - origin_y) / tile_size)], axis=1)
+    _, node_tile = np.unique(tile_xy.astype(np.int64), axis=0, return_inverse=True)
+    node_tile = node_tile.reshape(-1)
+    tile_x, tile_y = tile_xy[:len(fids1)].astype(np.int64).T
+    tiles = pd.DataFrame({"fid": fids1, "tile_x": tile_x, "tile_y": tile_y}).groupby(["tile_x", "tile_y"])["fid"]
+
+    tile_links = []
+    for (tx, ty), owned in tiles:
+        with instrument.span("tile", tile_x=int(tx), tile_y=int(ty), poly1=len(owned)) as counts:
+            tile1 = io.import_shapefile(poly1_path, fids=owned.to_numpy(), fid_as_index=True)
+            tile1["poly1_idx"] = tile1.index.to_numpy() + 1
+
+            # halo: 타일 경계 밖으로 걸친 poly1 bbox 전체를 포함하는 범위의 poly2만 읽기
+            halo = gpd.GeoSeries([shapely.box(*tile1.total_bounds)], crs=tile1.crs)
+            tile2 = io.import_shapefile(poly2_path, bbox=halo, fid_as_index=True)
+            tile2["poly2_idx"] = tile2.index.to_numpy() + 1
+            counts["poly2"] = len(tile2)
+            tile1 = tile1.reset_index(drop=True)
+            tile2 = tile2.reset_index(drop=True)
+
+            pos1, pos2, _, _ = polygon_matching_utils.candidate_pairs(tile1, tile2)
+            links = pd.DataFrame({
+                "poly1_idx": tile1["poly1_idx"].to_numpy()[pos1],
+                "poly2_idx": tile2["poly2_idx"].to_numpy()[pos2]
+            })
+            overlaps = polygon_matching_utils.compute_pair_overlaps(
+                tile1, tile2, links["poly1_idx"].to_numpy(), links["poly2_idx"].to_numpy(), workers, prune_threshold,
+                identical, snap_precision)
+            tile_links.append(pd.concat([links, overlaps], axis=1))
+            counts["links"] = len(links)
+
+    if not tile_links:
+        empty_ids = {"poly1_idx": np.empty(0, dtype=np.int64), "poly2_idx": np.empty(0, dtype=np.int64)}
+        tile_links.append(pd.DataFrame({
+            **empty_ids,
+            **{col: np.empty(0) for col in ["inter_area", "union_area", "area1", "area2", "iou", "ol1", "ol2"]}
+        }))
+    links = pd.concat(tile_links, ignore_index=True)
+    links = links.sort_values(["poly1_idx", "poly2_idx"]).reset_index(drop=True)
+    links["energy"] = links["iou"]
+
+    # 노드 번호: poly1은 [0, n1), poly2는 [n1, n1 + n2)
+    links.insert(2, "source", links["poly1_idx"].to_numpy() - 1)
+    links.insert(3, "target", len(poly1_ids) + links["poly2_idx"].to_numpy() - 1)
+
+    return {"poly1_ids": poly1_ids, "poly2_ids": poly2_ids, "links": links, "node_tile": node_tile}
+
+
+def add_energy_to_links(poly1, poly2, graph, workers=1, prune_threshold=None, identical=False, snap_precision=None):
+    links = graph["links"]
+    with instrument.span("energy", pairs=len(links)) as counts:
+        overlaps = polygon_matching_utils.compute_pair_overlaps(
+            poly1, poly2, links["poly1_idx"].to_numpy(), links["poly2_idx"].to_numpy(), workers, prune_threshold,
+            identical, snap_precision)
+        counts["pruned"] = int(overlaps["iou"].isna().sum())  # bbox 상한으로 생략한 overlay 수
+        if identical:
+            counts["identical"] = int((overlaps["iou"] == 1).sum())  # 동일 도형으로 생략한 overlay 수
+
+    links = pd.concat([links.reset_index(drop=True), overlaps], axis=1)
+    links["energy"] = links["iou"]
+    graph["links"] = links
+    return graph
+
+
+def split_graph_by_energy(poly1, poly2, graph, threshold):
+    links = graph["links"]
+    suppression = 0.7
 
-def split_graph_by_energy(poly1, poly2, graph_dict, threshold):
-    poly1 = poly1.set_index("poly1_idx")
-    poly2 = poly2.set_index("poly2_idx")
+    # threshold 미만 링크라도 poly1 기준 overlap이 크면 유지
+    with instrument.span("cut", links=len(links)) as counts:
+        keep = (links["energy"].to_numpy() >= threshold) | (links["ol1"].to_numpy() >= suppression)
 
-    G = nx.Graph()
-    original_links = graph_dict["links"]
-    original_nodes = graph_dict["nodes"]
+        kept_links = links[keep].reset_index(drop=True)
+        cut_links = links[~keep].reset_index(drop=True)
+        counts["cut_links"] = len(cut_links)
 
-    cut_links = []
-    kept_links = []
+    with instrument.span("components") as counts:
+        components = polygon_matching_utils.build_components(
+            graph["poly1_ids"], graph["poly2_ids"],
+            kept_links["source"].to_numpy(), kept_links["target"].to_numpy())
+        counts["components"] = components["num_components"]
 
-    suppression = 0.7
-
-    for link in original_links:
-        energy = link.get("energy", 0)
-
-        if energy >= threshold:
-            G.add_edge(link["source"], link["target"], energy=energy)
-            kept_links.append(link)
-        else:
-            p1_idx = int(link["source"].replace("p1_", ""))
-            p2_idx = int(link["target"].replace("p2_", ""))
-            geom1 = poly1.loc[p1_idx, "geometry"]
-            geom2 = poly2.loc[p2_idx, "geometry"]
-            area1 = poly1.loc[p1_idx, "area"]
-
-            intersection = geom1.intersection(geom2)
-            ol1 = intersection.area / area1 if area1 > 0 else 0
-
-            if ol1 < suppression:
-                cut_links.append(link)
-            else:
-                G.add_edge(link["source"], link["target"], energy=energy)
-                kept_links.append(link)
-
-    for node in original_nodes:
-        G.add_node(node["id"])
-
-    components_dict = {}
-    new_node_list = []
-    new_link_list = []
-
-    for comp_idx, comp in enumerate(nx.connected_components(G)):
-        poly1_set = sorted(int(n[3:]) for n in comp if n.startswith("p1_"))
-        poly2_set = sorted(int(n[3:]) for n in comp if n.startswith("p2_"))
-
-        components_dict[comp_idx] = {
-            "poly1_set": poly1_set,
-            "poly2_set": poly2_set
-        }
-
-        for n in comp:
-            new_node_list.append({"id": n, "comp_idx": comp_idx})
-
-        for u, v in G.subgraph(comp).edges:
-            source, target = (u, v) if u.startswith("p1_") else (v, u)
-            new_link_list.append({
-                "source": source,
-                "target": target,
-                "comp_idx": comp_idx,
-                "energy": G[source][target]["energy"]
-            })
+    kept_links["comp_idx"] = components["node_comp"][kept_links["source"].to_numpy()]
 
     summary = {
-        "after_components": len(components_dict),
+        "after_components": components["num_components"],
         "num_cut_links": len(cut_links)
     }
-    return components_dict, {"nodes": new_node_list, "links": new_link_list}, cut_links, summary
-
+    new_graph = {"poly1_ids": graph["poly1_ids"], "poly2_ids": graph["poly2_ids"], "links": kept_links}
+    return components, new_graph, cut_links, summary
+
+
+def sweep_cut_thresholds(poly1, poly2, graph, cut_thresholds, workers=1):
+    # 여러 cut_threshold를 한 번에 평가 (threshold 내림차순, 결과도 같은 순서)
+    # - 링크를 energy 내림차순으로 한 번 정렬하고 threshold마다 새로 유지되는 링크만 union-find에 추가
+    # - component는 합쳐지기만 하므로 (root 노드, 크기)가 같으면 이전 threshold와 같은 component
+    #   -> 새로 생기거나 커진 component만 union IoU 다시 계산
+    # - poly1/poly2 쪽 union은 노드 집합별로 캐시해서 한쪽만 커진 component는 다른 쪽 union 재사용
+    links = graph["links"]
+    poly1_ids = graph["poly1_ids"]
+    poly2_ids = graph["poly2_ids"]
+    n1 = len(poly1_ids)
+    num_nodes = n1 + len(poly2_ids)
+    suppression = 0.7
 
-def calculate_all_combination_metrics(poly1, poly2, components_dict, cut_links):
-    poly1, poly2 = polygon_matching_utils.mark_cut_links(poly1, poly2, cut_links)
-    poly1, poly2 = polygon_matching_utils.attach_metrics_from_components(components_dict, poly1, poly2)
-    # combination_df = polygon_matching_utils.generate_components_df(components_dict)
-    # final_metrics_df = polygon_matching_utils.compute_metrics_for_combi_df(combination_df, poly1, poly2)
-    # poly1, poly2 = polygon_matching_utils.attach_metrics_to_polys(poly1, poly2, final_metrics_df)
-    poly1, poly2 = polygon_matching_utils.add_component_sets_to_polys(poly1, poly2, components_dict)
+    source = links["source"].to_numpy()
+    target = links["target"].to_numpy()
+    link_iou = links["iou"].to_numpy()
+
+    # ol1 suppression 링크는 threshold와 무관하게 항상 유지 -> 맨 앞, bbox 상한으로 생략된 링크(NaN)는 맨 뒤
+    sort_energy = np.where(links["ol1"].to_numpy() >= suppression, np.inf, links["energy"].fillna(-np.inf).to_numpy())
+    order = np.argsort(-sort_energy, kind="stable")
+    neg_sorted_energy = -sort_energy[order]
+
+    node_rows = np.concatenate([
+        pd.Index(poly1["poly1_idx"]).get_indexer(poly1_ids),
+        pd.Index(poly2["poly2_idx"]).get_indexer(poly2_ids)
+    ])
+    geoms1 = np.asarray(poly1.geometry.values)
+    geoms2 = np.asarray(poly2.geometry.values)
+
+    parent = np.arange(num_nodes, dtype=np.int64)
+    num_kept = 0
+    iou_cache = {}
+    union_cache = {}
+    results = []
+    for threshold in sorted(set(cut_thresholds), reverse=True):
+        # energy >= threshold 인 링크까지 추가
+        upto = int(np.searchsorted(neg_sorted_energy, -threshold, side="right"))
+        added = order[num_kept:upto]
+        parent = polygon_matching_utils.connected_component_labels(num_nodes, source[added], target[added], parent)
+        num_kept = upto
+
+        components = polygon_matching_utils.components_from_roots(poly1_ids, poly2_ids, parent)
+        node_comp = components["node_comp"]
+        comp_ptr = components["comp_ptr"]
+        comp_nodes = components["comp_nodes"]
+        rel_comp = polygon_matching_utils.component_relations(components)
+        comp_keys = list(zip(comp_nodes[comp_ptr[:-1]].tolist(), np.diff(comp_ptr).tolist()))
+
+        # 1:1은 링크 IoU 그대로 사용
+        comp_iou = np.full(components["num_components"], np.nan)
+        kept = order[:num_kept]
+        one_to_one = rel_comp[node_comp[source[kept]]] == "1:1"
+        comp_iou[node_comp[source[kept][one_to_one]]] = link_iou[kept][one_to_one]
+
+        multi_comps = np.flatnonzero(np.isin(rel_comp, ["1:N", "N:1", "N:N"])).tolist()
+        changed = [c for c in multi_comps if comp_keys[c] not in iou_cache]
+        tasks = []
+        union_keys = []
+        for c in changed:
+            nodes = comp_nodes[comp_ptr[c]:comp_ptr[c + 1]]
+            key1 = ("poly1", tuple(nodes[nodes < n1].tolist()))
+            key2 = ("poly2", tuple(nodes[nodes >= n1].tolist()))
+            tasks.append((
+                [union_cache[key1]] if key1 in union_cache else geoms1[node_rows[list(key1[1])]],
+                [union_cache[key2]] if key2 in union_cache else geoms2[node_rows[list(key2[1])]]
+            ))
+            union_keys.append((key1, key2))
+        chunks = [tasks[a:b] for a, b in parallel.split_chunks(len(tasks), workers)]
+        unions = [r for chunk in parallel.map_chunks(polygon_matching_utils.union_iou_chunk, chunks, workers, "process")
+                  for r in chunk]
+        for c, (key1, key2), (iou, union1, union2) in zip(changed, union_keys, unions):
+            iou_cache[comp_keys[c]] = iou
+            if len(key1[1]) > 1:
+                union_cache[key1] = union1
+            if len(key2[1]) > 1:
+                union_cache[key2] = union2
+        comp_iou[multi_comps] = [iou_cache[comp_keys[c]] for c in multi_comps]
+
+        results.append({
+            "cut_threshold": threshold,
+            "components": components,
+            "relation": rel_comp,
+            "union_iou": comp_iou,
+            "num_cut_links": len(links) - num_kept,
+            "recomputed": len(tasks)
+        })
+    return results
+
+
+def calculate_all_combination_metrics(poly1, poly2, components, cut_links, links, workers=1, best_subset_max=12):
+    with instrument.span("metrics", components=components["num_components"]):
+        poly1, poly2 = polygon_matching_utils.mark_cut_links(poly1, poly2, cut_links)
+        with instrument.span("component_metrics"):
+            poly1, poly2, union_areas = polygon_matching_utils.attach_metrics_from_components(components, poly1, poly2,
+                                                                                              links, workers)
+        # N:N 조합 metric: 모든 부분집합 조합 대신 IoU 최대 부분집합 쌍만 탐색 (각 쪽 union 면적은 위에서 계산한 값 사용)
+        with instrument.span("best_subset"):
+            poly1, poly2 = polygon_matching_utils.attach_best_subset_metrics(components, poly1, poly2, workers,
+                                                                             best_subset_max, union_areas)
+        with instrument.span("component_sets"):
+            poly1, poly2 = polygon_matching_utils.add_component_sets_to_polys(poly1, poly2, components)
     return cut_links, poly1, poly2
 
 
-def algorithm_pipeline(poly1_path, poly2_path, output_path, cut_threshold):
-    poly1 = io.import_shapefile(poly1_path)
-    poly2 = io.import_shapefile(poly2_path)
-    poly1, poly2, joined = indexing(poly1, poly2)
-    graph = build_graph(joined)
-    graph = add_energy_to_links(poly1, poly2, graph)
+def build_matching_graph(poly1_path, poly2_path, tile_size=None, workers=1, prune_threshold=None,
+                         identical=False, snap_precision=None):
+    # prune_threshold: 이 값 이상의 cut_threshold에서 cut될 것이 bbox 상한으로 확실한 링크는 overlay 생략
+    # identical: 같은 도형(정규화 WKB 일치, snap_precision 격자 기준)인 링크는 overlay 없이 IoU 1
+    #   (후보 쌍 탐색은 전체 대상이므로 이웃과의 링크/component는 전체 실행과 동일)
+    # 타일 단위 실행은 전체 입력을 읽지 않으므로 poly1, poly2 대신 None 반환 (필요한 행은 호출 측에서 fid로 읽음)
+    if tile_size:
+        # 타일 단위로 후보 쌍과 overlap 계산 후 전역 union-find로 component 연결
+        with instrument.span("energy") as counts:
+            graph = build_tiled_graph(poly1_path, poly2_path, tile_size, workers, prune_threshold, identical,
+                                      snap_precision)
+            counts["pairs"] = len(graph["links"])
+            counts["pruned"] = int(graph["links"]["iou"].isna().sum())
+            if identical:
+                counts["identical"] = int((graph["links"]["iou"] == 1).sum())
+        poly1, poly2 = None, None
+    else:
+        poly1 = io.import_shapefile(poly1_path)
+        poly2 = io.import_shapefile(poly2_path)
+        poly1, poly2, joined = indexing(poly1, poly2)
+        graph = build_graph(joined)
+        graph = add_energy_to_links(poly1, poly2, graph, workers, prune_threshold, identical, snap_precision)
+    return poly1, poly2, graph
+
+
+def run_matching(poly1_path, poly2_path, cut_threshold, tile_size=None, workers=1, identical=False, snap_precision=None,
+                 best_subset_max=12, matching="union"):
+    # matching: union (component union 기준 metric), assignment (+ 링크 IoU 기준 1:1 매칭 상대)
+    if matching not in ("union", "assignment"):
+        raise ValueError(f"Unknown matching: {matching} (union, assignment 중 선택)")
+    if tile_size:
+        return run_tiled_matching(poly1_path, poly2_path, cut_threshold, tile_size, workers, identical, snap_precision,
+                                  best_subset_max, matching)
+    poly1, poly2, graph = build_matching_graph(poly1_path, poly2_path, tile_size, workers, cut_threshold,
+                                               identical, snap_precision)
     component, graph, cut_link, summary = split_graph_by_energy(poly1, poly2, graph, cut_threshold)
-    final_metrics, poly1, poly2 = calculate_all_combination_metrics(poly1, poly2, component, cut_link)
+    final_metrics, poly1, poly2 = calculate_all_combination_metrics(poly1, poly2, component, cut_link, graph["links"], workers,
+                                                                    best_subset_max)
+    if matching == "assignment":
+        with instrument.span("assignment"):
+            poly1, poly2 = polygon_matching_utils.attach_assignment(poly1, poly2, component, graph["links"])
+    return final_metrics, poly1, poly2, component
+
+
+def run_tiled_matching(poly1_path, poly2_path, cut_threshold, tile_size, workers=1, identical=False,
+                       snap_precision=None, best_subset_max=12, matching="union"):
+    # 링크/component는 전체 기준으로 만들고 metric은 타일 단위로 계산 (전체 입력을 한 번에 읽지 않음)
+    # - component는 첫 노드(poly1 우선)의 bbox 중심이 속한 타일이 담당 (타일 경계에 걸친 component도 한 타일에서 계산)
+    # - 타일마다 담당 component의 폴리곤만 fid로 읽어 전체 실행과 같은 metric 계산, 결과는 poly_idx 순서로 합침
+    _, _, graph = build_matching_graph(poly1_path, poly2_path, tile_size, workers, cut_threshold, identical,
+                                       snap_precision)
+    components, kept_graph, cut_links, _ = split_graph_by_energy(None, None, graph, cut_threshold)
+    links = kept_graph["links"]
+    node_comp = components["node_comp"]
+
+    comp_tile = graph["node_tile"][components["comp_nodes"][components["comp_ptr"][:-1]]]
+    comps_by_tile = polygon_matching_utils.group_positions(comp_tile)
+    links_by_tile = polygon_matching_utils.group_positions(comp_tile[links["comp_idx"].to_numpy()])
+    # cut 링크는 양 끝 노드의 component를 담당하는 타일 모두에서 필요 (cut_link 표시)
+    cut_by_tile1 = polygon_matching_utils.group_positions(comp_tile[node_comp[cut_links["source"].to_numpy()]])
+    cut_by_tile2 = polygon_matching_utils.group_positions(comp_tile[node_comp[cut_links["target"].to_numpy()]])
+    empty = np.empty(0, dtype=np.int64)
+
+    tiles1, tiles2 = [], []
+    for tile, comp_ids in comps_by_tile.items():
+        with instrument.span("metric_tile", tile=int(tile), components=len(comp_ids)) as counts:
+            tile_components, tile_links = polygon_matching_utils.subset_components(
+                components, links.iloc[links_by_tile.get(tile, empty)], comp_ids)
+            tile_cut_links = cut_links.iloc[np.concatenate([cut_by_tile1.get(tile, empty),
+                                                            cut_by_tile2.get(tile, empty)])]
+
+            ids1 = tile_components["poly1_ids"]
+            ids2 = tile_components["poly2_ids"]
+            tile1 = io.import_shapefile(poly1_path, fids=ids1 - 1)
+            tile2 = io.import_shapefile(poly2_path, fids=ids2 - 1)
+            tile1, tile2 = add_index_columns(tile1, tile2, ids1, ids2)
+
+            _, tile1, tile2 = calculate_all_combination_metrics(tile1, tile2, tile_components, tile_cut_links,
+                                                                tile_links, workers, best_subset_max)
+            if matching == "assignment":
+                with instrument.span("assignment"):
+                    tile1, tile2 = polygon_matching_utils.attach_assignment(tile1, tile2, tile_components,
+                                                                            tile_links)
+
+            # 타일 안에서 다시 매긴 component 번호 -> 전체 번호
+            for tile_poly in (tile1, tile2):
+                tile_poly["comp_idx"] = comp_ids[tile_poly["comp_idx"].to_numpy().astype(np.int64)].astype(float)
+            tiles1.append(tile1)
+            tiles2.append(tile2)
+            counts["poly1"], counts["poly2"] = len(ids1), len(ids2)
+
+    poly1 = pd.concat(tiles1, ignore_index=True).sort_values("poly1_idx", kind="stable").reset_index(drop=True)
+    poly2 = pd.concat(tiles2, ignore_index=True).sort_values("poly2_idx", kind="stable").reset_index(drop=True)
+    return cut_links, poly1, poly2, components
+
+
+def read_linked_geometries(poly1_path, poly2_path, graph):
+    # 타일 단위 그래프에서 링크가 있는 폴리곤의 geometry만 읽기 (여러 폴리곤 component의 union 계산용)
+    linked1 = np.unique(graph["links"]["poly1_idx"].to_numpy())
+    linked2 = np.unique(graph["links"]["poly2_idx"].to_numpy())
+    poly1 = io.import_shapefile(poly1_path, columns=[], fids=linked1 - 1)
+    poly2 = io.import_shapefile(poly2_path, columns=[], fids=linked2 - 1)
+    poly1["poly1_idx"] = linked1
+    poly2["poly2_idx"] = linked2
+    return poly1, poly2
+
+
+def fingerprint_input(source):
+    # 입력은 파일 경로 또는 artifact 저장소가 넘겨준 메모리의 GeoDataFrame
+    if isinstance(source, gpd.GeoDataFrame):
+        return cache.fingerprint_frame(source)
+    return cache.fingerprint_file(source)
+
+
+def algorithm_pipeline(poly1_path, poly2_path, output_path, cut_threshold, tile_size=None, workers=1, cache_dir=None,
+                       identical=False, snap_precision=None, best_subset_max=12, matching="union"):
+    if not cache_dir:
+        with instrument.span("matching"):
+            final_metrics, poly1, poly2, _ = run_matching(poly1_path, poly2_path, cut_threshold, tile_size, workers,
+                                                          identical, snap_precision, best_subset_max, matching)
+        return final_metrics, poly1, poly2
+
+    # 두 입력의 내용 해시 + cut_threshold로 매칭 결과 캐시 (tile_size, workers는 결과에 영향 없음)
+    key = cache.make_key("algorithm_pipeline", MATCHING_CACHE_VERSION,
+                         fingerprint_input(poly1_path), fingerprint_input(poly2_path), cut_threshold,
+                         identical, snap_precision, best_subset_max, matching)
+    with instrument.span("matching_cache_load") as counts:
+        cached = cache.load(cache_dir, key)
+        counts["hit"] = cached is not None
+    if cached is not None:
+        return cached["cut_links"], cached["poly1"], cached["poly2"]
+
+    with instrument.span("matching"):
+        final_metrics, poly1, poly2, component = run_matching(poly1_path, poly2_path, cut_threshold, tile_size,
+                                                              workers, identical, snap_precision, best_subset_max,
+                                                              matching)
+    cache.store(cache_dir, key, {"cut_links": final_metrics, "poly1": poly1, "poly2": poly2, "components": component})
     return final_metrics, poly1, poly2
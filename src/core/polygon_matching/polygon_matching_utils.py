@@ -1,8 +1,13 @@
-import pandas as pd
 from itertools import chain, combinations
-from shapely.ops import unary_union
-import numpy as np
-import geopandas as gpd
+from src.utils import parallel
+from src.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+shapely = lazy_import("shapely")
+np = lazy_import("numpy")
+gpd = lazy_import("geopandas")
+sparse = lazy_import("scipy.sparse")
+csgraph = lazy_import("scipy.sparse.csgraph")
 
 
 def all_nonempty_subsets(lst):
@@ -114,8 +119,8 @@ def compute_metrics_for_combi_df(df, poly1_gdf, poly2_gdf):
             continue
 
         # union
-        geom1 = unary_union(poly1_gdf[poly1_gdf['poly1_idx'].isin(poly1_ids)].geometry)
-        geom2 = unary_union(poly2_gdf[poly2_gdf['poly2_idx'].isin(poly2_ids)].geometry)
+        geom1 = shapely.union_all(poly1_gdf[poly1_gdf['poly1_idx'].isin(poly1_ids)].geometry)
+        geom2 = shapely.union_all(poly2_gdf[poly2_gdf['poly2_idx'].isin(poly2_ids)].geometry)
 
         if geom1 and geom2 and not geom1.is_empty and not geom2.is_empty:
             intersection = geom1.intersection(geom2)
@@ -241,33 +246,22 @@ def attach_metrics_to_polys(poly1, poly2, combi_df):
     return poly1, poly2
 
 
-def add_component_sets_to_polys(poly1, poly2, components_dict):
+def add_component_sets_to_polys(poly1, poly2, components):
     poly1 = poly1.copy()
     poly2 = poly2.copy()
 
-    # 새로운 열 초기화
-    poly1['poly1_set'] = None
-    poly1['poly2_set'] = None
-    poly2['poly1_set'] = None
-    poly2['poly2_set'] = None
-
-    # poly1에 붙이기
-    for idx, row in poly1.iterrows():
-        p1_id = row['poly1_idx']
-        for comp in components_dict.values():
-            if p1_id in comp['poly1_set']:
-                poly1.at[idx, 'poly1_set'] = comp['poly1_set']
-                poly1.at[idx, 'poly2_set'] = comp['poly2_set']
-                break  # 하나의 component만 매칭되므로 break
-
-    # poly2에 붙이기
-    for idx, row in poly2.iterrows():
-        p2_id = row['poly2_idx']
-        for comp in components_dict.values():
-            if p2_id in comp['poly2_set']:
-                poly2.at[idx, 'poly1_set'] = comp['poly1_set']
-                poly2.at[idx, 'poly2_set'] = comp['poly2_set']
-                break
+    poly1_sets, poly2_sets = component_sets(components)
+    n1 = len(components["poly1_ids"])
+    node_comp = components["node_comp"]
+
+    # poly_idx -> component (노드 번호 -> component 조회)
+    comp_of_row1 = node_comp[:n1][_lookup_positions(components["poly1_ids"], poly1["poly1_idx"])]
+    comp_of_row2 = node_comp[n1:][_lookup_positions(components["poly2_ids"], poly2["poly2_idx"])]
+
+    poly1["poly1_set"] = [poly1_sets[c] for c in comp_of_row1.tolist()]
+    poly1["poly2_set"] = [poly2_sets[c] for c in comp_of_row1.tolist()]
+    poly2["poly1_set"] = [poly1_sets[c] for c in comp_of_row2.tolist()]
+    poly2["poly2_set"] = [poly2_sets[c] for c in comp_of_row2.tolist()]
 
     # 열 순서 정리: comp_idx 다음에 poly1_set, poly2_set 붙이기
     def insert_after(df, after_col, insert_cols):
@@ -361,35 +355,45 @@ def assign_cd_class(poly, threshold, prefix="cd"):
 
 
 def mark_cut_links(poly1, poly2, cut_links):
-    cut_poly1_idxs = set(int(link["source"].replace("p1_", "")) for link in cut_links if link["source"].startswith("p1_"))
-    cut_poly2_idxs = set(int(link["target"].replace("p2_", "")) for link in cut_links if link["target"].startswith("p2_"))
-
     poly1 = poly1.copy()
     poly2 = poly2.copy()
 
-    poly1["cut_link"] = poly1["poly1_idx"].isin(cut_poly1_idxs)
-    poly2["cut_link"] = poly2["poly2_idx"].isin(cut_poly2_idxs)
+    poly1["cut_link"] = poly1["poly1_idx"].isin(cut_links["poly1_idx"])
+    poly2["cut_link"] = poly2["poly2_idx"].isin(cut_links["poly2_idx"])
 
     return poly1, poly2
 
 
-def outer_join(poly1, poly2, poly1_prefix="poly1", poly2_prefix="poly2"):
-    left_join = gpd.sjoin(poly1, poly2, how='left', predicate='intersects')
-    right_join = gpd.sjoin(poly2, poly1, how='left', predicate='intersects')
-    left_join.columns = [
-        col.replace('_left', '_poly1').replace('_right', '_poly2')
-        for col in left_join.columns
-    ]
+def candidate_pairs(poly1, poly2):
+    # STRtree bulk query 한 번으로 교차하는 (poly1, poly2) 행 위치 쌍 계산
+    pos1, pos2 = poly2.sindex.query(poly1.geometry.values, predicate="intersects")
+    order = np.lexsort((pos2, pos1))
+    pos1 = pos1[order].astype(np.int64)
+    pos2 = pos2[order].astype(np.int64)
 
-    right_join.columns = [
-        col.replace('_left', '_poly2').replace('_right', '_poly1')
-        for col in right_join.columns
-    ]
+    unmatched1 = np.setdiff1d(np.arange(len(poly1)), pos1)
+    unmatched2 = np.setdiff1d(np.arange(len(poly2)), pos2)
+    return pos1, pos2, unmatched1, unmatched2
 
-    joined = pd.merge(left_join, right_join, how='outer', on=list(set(left_join.columns) & set(right_join.columns)))
-    subset_cols = [f"{poly1_prefix}_idx", f"{poly2_prefix}_idx"]
-    joined = joined.drop_duplicates(subset=subset_cols)
-    joined = joined.reset_index(drop=True)
+
+def outer_join_idx(poly1, poly2, poly1_prefix="poly1", poly2_prefix="poly2"):
+    # 양방향 sjoin(intersects)을 outer merge한 것과 같은 (idx1, idx2) 조합을 idx 열 두 개만으로 반환
+    idx1_col = f"{poly1_prefix}_idx"
+    idx2_col = f"{poly2_prefix}_idx"
+    pos1, pos2, unmatched1, unmatched2 = candidate_pairs(poly1, poly2)
+
+    idx1 = poly1[idx1_col].to_numpy(dtype=float)
+    idx2 = poly2[idx2_col].to_numpy(dtype=float)
+
+    joined = pd.DataFrame({
+        idx1_col: np.concatenate([idx1[pos1], idx1[unmatched1], np.full(len(unmatched2), np.nan)]),
+        idx2_col: np.concatenate([idx2[pos2], np.full(len(unmatched1), np.nan), idx2[unmatched2]])
+    })
+
+    # 결측이 없으면 원래 dtype 유지 (merge 결과와 동일하게)
+    for col, src in ((idx1_col, poly1), (idx2_col, poly2)):
+        if not joined[col].isna().any():
+            joined[col] = joined[col].astype(src[col].dtype)
     return joined
 
 
@@ -527,8 +531,9 @@ def bd_result_attach(dmap, seg):
 
 
 def confusion_matrix_to_cd(cd_prev, cd_cur, confusion_matrix):
-    cd_prev = cd_prev.copy()
-    cd_cur = cd_cur.copy()
+    # 이미 GT를 붙인 결과가 입력으로 들어와도 열이 중복(gt_class_x 등)되지 않도록 이전 값은 제거
+    cd_prev = cd_prev.drop(columns=['gt_class', 'cd_status'], errors='ignore')
+    cd_cur = cd_cur.drop(columns=['gt_class', 'cd_status'], errors='ignore')
 
     # 🔹 cd_prev에 붙이기 (신축, NaN 제외)
     prev_merge = confusion_matrix[
@@ -573,120 +578,662 @@ def confusion_matrix_to_cd(cd_prev, cd_cur, confusion_matrix):
     return cd_prev, cd_cur
 
 
-def attach_metrics_from_components(components_dict, poly1, poly2):
+def component_relations(components):
+    # Relation: component별 poly1, poly2 개수로 결정
+    n1 = len(components["poly1_ids"])
+    node_comp = components["node_comp"]
+    num_components = components["num_components"]
+    cnt1 = np.bincount(node_comp[:n1], minlength=num_components)
+    cnt2 = np.bincount(node_comp[n1:], minlength=num_components)
+    return np.select(
+        [cnt2 == 0, cnt1 == 0, (cnt1 == 1) & (cnt2 == 1), cnt1 == 1, cnt2 == 1],
+        ["1:0", "0:1", "1:1", "1:N", "N:1"],
+        "N:N"
+    ).astype(object)
+
+
+def calc_metrics(g1, g2):
+    if g1 is None or g2 is None:
+        return (np.nan, np.nan, np.nan)
+    inter = g1.intersection(g2).area
+    if inter == 0:
+        return (0, 0, 0)
+    return (
+        inter / g1.union(g2).area,
+        inter / g1.area if g1.area > 0 else 0,
+        inter / g2.area if g2.area > 0 else 0
+    )
+
+
+def union_all(geoms):
+    if len(geoms) == 1:
+        return geoms[0]
+    # 수치지도 건물처럼 경계가 정확히 맞닿고 겹치지 않는 집합(valid coverage)은
+    # 공유 경계만 제거하는 coverage union으로 충분, 아니면 일반 overlay union
+    geoms = np.asarray(geoms)
+    if shapely.is_valid(geoms).all() and shapely.coverage_is_valid(geoms):
+        return shapely.coverage_union_all(geoms)
+    return shapely.union_all(geoms)
+
+
+def union_metrics(rel, geoms1, geoms2):
+    # component 하나의 union 기반 metric (1:N, N:1, N:N)
+    if rel == "1:N":
+        # n1: poly1 vs union(poly2)
+        return {"n1": calc_metrics(geoms1[0], union_all(geoms2))}
+
+    if rel == "N:1":
+        # 1n: union(poly1) vs poly2
+        return {"1n": calc_metrics(union_all(geoms1), geoms2[0])}
+
+    g1_union = union_all(geoms1)
+    g2_union = union_all(geoms2)
+    return {
+        # 11: union vs union
+        "11": calc_metrics(g1_union, g2_union),
+        # 1n: union(poly1) vs each poly2
+        "1n": [calc_metrics(g1_union, g2) for g2 in geoms2],
+        # n1: each poly1 vs union(poly2)
+        "n1": [calc_metrics(g1, g2_union) for g1 in geoms1],
+        # 각 쪽 union 면적 (best subset의 겹침 여부 판단에 재사용)
+        "union_area": (g1_union.area, g2_union.area)
+    }
+
+
+def union_iou(geoms1, geoms2):
+    # component 전체 union 기준 IoU (1:N은 poly1, N:1은 poly2를 그대로 사용)
+    # union 결과도 반환해서 호출 측에서 재사용 (이미 계산된 union은 길이 1 배열로 넘기면 그대로 사용)
+    g1 = union_all(geoms1)
+    g2 = union_all(geoms2)
+    return calc_metrics(g1, g2)[0], g1, g2
+
+
+def union_iou_chunk(tasks):
+    return [union_iou(geoms1, geoms2) for geoms1, geoms2 in tasks]
+
+
+def union_metrics_chunk(tasks):
+    return [union_metrics(rel, geoms1, geoms2) for rel, geoms1, geoms2 in tasks]
+
+
+def attach_metrics_from_components(components, poly1, poly2, links, workers=1):
+    # 반환: metric을 붙인 poly1, poly2, N:N component별 각 쪽 union 면적 {comp_idx: (poly1 쪽, poly2 쪽)}
     poly1 = poly1.copy()
     poly2 = poly2.copy()
 
-    # 초기화
     metric_cols = [
-        "comp_idx", "Relation",
         "iou_1n", "ol_pl1_1n", "ol_pl2_1n",
         "iou_n1", "ol_pl1_n1", "ol_pl2_n1",
         "iou_11", "ol_pl1_11", "ol_pl2_11",
         "iou_nn", "ol_pl1_nn", "ol_pl2_nn"
     ]
-    for col in metric_cols[2:]:
-        poly1[col] = np.nan
-        poly2[col] = np.nan
-    poly1["comp_idx"] = np.nan
-    poly2["comp_idx"] = np.nan
-    poly1["Relation"] = np.nan
-    poly2["Relation"] = np.nan
-
-    def calc_metrics(g1, g2):
-        if g1 is None or g2 is None:
-            return (np.nan, np.nan, np.nan)
-        inter = g1.intersection(g2).area
-        if inter == 0:
-            return (0, 0, 0)
-        return (
-            inter / g1.union(g2).area,
-            inter / g1.area if g1.area > 0 else 0,
-            inter / g2.area if g2.area > 0 else 0
-        )
-
-    for comp_idx, comp in components_dict.items():
-        p1_set = comp["poly1_set"]
-        p2_set = comp["poly2_set"]
-
-        rel = (
-            "1:0" if len(p2_set) == 0 else
-            "0:1" if len(p1_set) == 0 else
-            "1:1" if len(p1_set) == 1 and len(p2_set) == 1 else
-            "1:N" if len(p1_set) == 1 else
-            "N:1" if len(p2_set) == 1 else "N:N"
-        )
-
-        poly1.loc[poly1['poly1_idx'].isin(p1_set), ["comp_idx", "Relation"]] = [comp_idx, rel]
-        poly2.loc[poly2['poly2_idx'].isin(p2_set), ["comp_idx", "Relation"]] = [comp_idx, rel]
+    col_pos = {col: i for i, col in enumerate(metric_cols)}
+
+    # 행 위치 기준으로 채울 배열 (열 단위: metric_cols 순서)
+    m1 = np.full((len(metric_cols), len(poly1)), np.nan)
+    m2 = np.full((len(metric_cols), len(poly2)), np.nan)
+    comp1 = np.full(len(poly1), np.nan)
+    comp2 = np.full(len(poly2), np.nan)
+    rel1 = np.full(len(poly1), np.nan, dtype=object)
+    rel2 = np.full(len(poly2), np.nan, dtype=object)
+
+    def put(m, group, rows, values):
+        i = col_pos[f"iou_{group}"]
+        m[i:i + 3, rows] = np.asarray(values, dtype=float).T
+
+    poly1_ids = components["poly1_ids"]
+    poly2_ids = components["poly2_ids"]
+    n1 = len(poly1_ids)
+    node_comp = components["node_comp"]
+    comp_ptr = components["comp_ptr"]
+    comp_nodes = components["comp_nodes"]
+    num_components = components["num_components"]
+
+    # 노드 번호 -> 행 위치
+    node_rows = np.concatenate([
+        pd.Index(poly1["poly1_idx"]).get_indexer(poly1_ids),
+        pd.Index(poly2["poly2_idx"]).get_indexer(poly2_ids)
+    ])
+    rows1 = node_rows[:n1]
+    rows2 = node_rows[n1:]
+
+    rel_comp = component_relations(components)
+
+    comp1[rows1] = node_comp[:n1]
+    comp2[rows2] = node_comp[n1:]
+    rel1[rows1] = rel_comp[node_comp[:n1]]
+    rel2[rows2] = rel_comp[node_comp[n1:]]
+
+    # 단일 쌍 metric은 링크 overlap 테이블에서 조회
+    link_source = links["source"].to_numpy()
+    link_target = links["target"].to_numpy()
+    link_metrics = links[["iou", "ol1", "ol2"]].to_numpy()
+
+    # 1:1: 유일한 링크의 metric
+    one_to_one = rel_comp[links["comp_idx"].to_numpy()] == "1:1"
+    put(m1, "nn", node_rows[link_source[one_to_one]], link_metrics[one_to_one])
+    put(m2, "nn", node_rows[link_target[one_to_one]], link_metrics[one_to_one])
+
+    pair_metrics = dict(zip(zip(link_source.tolist(), link_target.tolist()), map(tuple, link_metrics.tolist())))
+
+    geoms1 = np.asarray(poly1.geometry.values)
+    geoms2 = np.asarray(poly2.geometry.values)
+
+    multi_comps = np.flatnonzero(np.isin(rel_comp, ["1:N", "N:1", "N:N"]))
+    comp_rows = []
+    for comp_idx in multi_comps:
+        nodes = comp_nodes[comp_ptr[comp_idx]:comp_ptr[comp_idx + 1]]
+        nodes1 = nodes[nodes < n1]
+        nodes2 = nodes[nodes >= n1]
+        comp_rows.append((nodes1, nodes2, node_rows[nodes1], node_rows[nodes2]))
+
+    # component별 union 연산은 worker에 나눠서 실행 (결과 순서는 component 순서 그대로)
+    tasks = [(rel_comp[c], geoms1[r1], geoms2[r2]) for c, (_, _, r1, r2) in zip(multi_comps, comp_rows)]
+    chunks = [tasks[a:b] for a, b in parallel.split_chunks(len(tasks), workers)]
+    results = [m for chunk in parallel.map_chunks(union_metrics_chunk, chunks, workers, "process") for m in chunk]
+
+    union_areas = {}
+    for comp_idx, (nodes1, nodes2, r1, r2), metrics in zip(multi_comps, comp_rows, results):
+        rel = rel_comp[comp_idx]
 
         if rel == "1:N":
-            g1 = poly1.loc[poly1['poly1_idx'] == p1_set[0], "geometry"].values[0]
-            g2_union = unary_union(poly2.loc[poly2['poly2_idx'].isin(p2_set), "geometry"])
-
             # n1: poly1 vs union(poly2)
-            iou_n1, ol1_n1, ol2_n1 = calc_metrics(g1, g2_union)
-            poly1.loc[poly1['poly1_idx'] == p1_set[0], ["iou_n1", "ol_pl1_n1", "ol_pl2_n1"]] = [iou_n1, ol1_n1, ol2_n1]
-            poly2.loc[poly2['poly2_idx'].isin(p2_set), ["iou_n1", "ol_pl1_n1", "ol_pl2_n1"]] = [iou_n1, ol1_n1, ol2_n1]
+            put(m1, "n1", r1, [metrics["n1"]])
+            put(m2, "n1", r2, [metrics["n1"]])
 
-            # nn: poly1 vs each poly2
-            for p2 in p2_set:
-                g2 = poly2.loc[poly2['poly2_idx'] == p2, "geometry"].values[0]
-                iou, ol1, ol2 = calc_metrics(g1, g2)
-                poly2.loc[poly2['poly2_idx'] == p2, ["iou_nn", "ol_pl1_nn", "ol_pl2_nn"]] = [iou, ol1, ol2]
-            poly1.loc[poly1['poly1_idx'] == p1_set[0], ["iou_nn", "ol_pl1_nn", "ol_pl2_nn"]] = [iou, ol1, ol2]
+            # nn: poly1 vs each poly2 (poly1에는 마지막 값)
+            nn = [pair_metrics[(int(nodes1[0]), n)] for n in nodes2.tolist()]
+            put(m2, "nn", r2, nn)
+            put(m1, "nn", r1, nn[-1:])
 
         elif rel == "N:1":
-            g2 = poly2.loc[poly2['poly2_idx'] == p2_set[0], "geometry"].values[0]
-            g1_union = unary_union(poly1.loc[poly1['poly1_idx'].isin(p1_set), "geometry"])
-
             # 1n: union(poly1) vs poly2
-            iou_1n, ol1_1n, ol2_1n = calc_metrics(g1_union, g2)
-            poly1.loc[poly1['poly1_idx'].isin(p1_set), ["iou_1n", "ol_pl1_1n", "ol_pl2_1n"]] = [iou_1n, ol1_1n, ol2_1n]
-            poly2.loc[poly2['poly2_idx'] == p2_set[0], ["iou_1n", "ol_pl1_1n", "ol_pl2_1n"]] = [iou_1n, ol1_1n, ol2_1n]
+            put(m1, "1n", r1, [metrics["1n"]])
+            put(m2, "1n", r2, [metrics["1n"]])
 
-            # nn: each poly1 vs poly2
-            for p1 in p1_set:
-                g1 = poly1.loc[poly1['poly1_idx'] == p1, "geometry"].values[0]
-                iou, ol1, ol2 = calc_metrics(g1, g2)
-                poly1.loc[poly1['poly1_idx'] == p1, ["iou_nn", "ol_pl1_nn", "ol_pl2_nn"]] = [iou, ol1, ol2]
-            poly2.loc[poly2['poly2_idx'] == p2_set[0], ["iou_nn", "ol_pl1_nn", "ol_pl2_nn"]] = [iou, ol1, ol2]
-
-        elif rel == "N:N":
-            g1_union = unary_union(poly1.loc[poly1['poly1_idx'].isin(p1_set), "geometry"])
-            g2_union = unary_union(poly2.loc[poly2['poly2_idx'].isin(p2_set), "geometry"])
+            # nn: each poly1 vs poly2 (poly2에는 마지막 값)
+            nn = [pair_metrics[(n, int(nodes2[0]))] for n in nodes1.tolist()]
+            put(m1, "nn", r1, nn)
+            put(m2, "nn", r2, nn[-1:])
 
+        else:
             # 11: union vs union
-            iou_11, ol1_11, ol2_11 = calc_metrics(g1_union, g2_union)
-            poly1.loc[poly1['poly1_idx'].isin(p1_set), ["iou_11", "ol_pl1_11", "ol_pl2_11"]] = [iou_11, ol1_11, ol2_11]
-            poly2.loc[poly2['poly2_idx'].isin(p2_set), ["iou_11", "ol_pl1_11", "ol_pl2_11"]] = [iou_11, ol1_11, ol2_11]
+            put(m1, "11", r1, [metrics["11"]])
+            put(m2, "11", r2, [metrics["11"]])
+
+            # 1n: union(poly1) vs each poly2 (poly1에는 마지막 값)
+            put(m2, "1n", r2, metrics["1n"])
+            put(m1, "1n", r1, metrics["1n"][-1:])
+
+            # n1: each poly1 vs union(poly2) (poly2에는 마지막 값)
+            put(m1, "n1", r1, metrics["n1"])
+            put(m2, "n1", r2, metrics["n1"][-1:])
+            union_areas[int(comp_idx)] = metrics["union_area"]
+
+    # 한 번에 붙이기
+    new_cols1 = {col: m1[i] for i, col in enumerate(metric_cols)}
+    new_cols2 = {col: m2[i] for i, col in enumerate(metric_cols)}
+    new_cols1.update({"comp_idx": comp1, "Relation": rel1})
+    new_cols2.update({"comp_idx": comp2, "Relation": rel2})
+
+    poly1 = poly1.assign(**new_cols1)
+    poly2 = poly2.assign(**new_cols2)
+
+    return poly1, poly2, union_areas
+
+
+def best_partner_subset(inter, area, base_area):
+    # 한쪽 집합(면적 base_area)이 고정일 때 IoU를 최대로 하는 상대쪽 부분집합
+    # IoU = ΣI / (base_area + Σ(area - I)) 이므로 I / (area - I) 내림차순 prefix 중에 최적해가 있음
+    rest = area - inter
+    ratio = np.divide(inter, rest, out=np.full(len(inter), np.inf), where=rest > 0)
+    order = np.argsort(-ratio, kind="stable")
+    order = order[inter[order] > 0]
+    if len(order) == 0:
+        return 0.0, order
+
+    cum_inter = np.cumsum(inter[order])
+    iou = cum_inter / (base_area + np.cumsum(rest[order]))
+    k = int(np.argmax(iou))
+    return float(iou[k]), order[:k + 1]
+
+
+def best_subset_search(inter, area1, area2):
+    # inter: (n1, n2) 쌍별 교차 면적, 각 쪽 폴리곤끼리 겹치지 않을 때 집합 면적/교차 면적은 합으로 계산됨
+    # poly1 쪽 부분집합은 branch-and-bound로 탐색하고 poly2 쪽은 best_partner_subset으로 결정
+    n1 = len(area1)
+    best = {"iou": 0.0, "set1": np.empty(0, dtype=np.int64), "set2": np.empty(0, dtype=np.int64)}
+
+    # IoU <= ol1 <= Σ(poly1별 전체 교차 면적) / Σ(poly1 면적)
+    row_inter = inter.sum(axis=1)
+    order = np.argsort(-(row_inter / area1), kind="stable").tolist()
+
+    def upper_bound(inter_sum, area_sum, remaining):
+        ub = inter_sum / area_sum
+        for i in remaining:
+            inter_sum += row_inter[i]
+            area_sum += area1[i]
+            ub = max(ub, inter_sum / area_sum)
+        return min(ub, 1.0)
+
+    def search(pos, chosen, inter_sum, area_sum):
+        if chosen:
+            iou, set2 = best_partner_subset(inter[chosen].sum(axis=0), area2, area_sum)
+            if iou > best["iou"]:
+                best.update(iou=iou, set1=np.array(chosen, dtype=np.int64), set2=set2)
+        for k in range(pos, n1):
+            i = order[k]
+            if upper_bound(inter_sum + row_inter[i], area_sum + area1[i], order[k + 1:]) <= best["iou"]:
+                continue
+            search(k + 1, chosen + [i], inter_sum + row_inter[i], area_sum + area1[i])
+
+    search(0, [], 0.0, 0.0)
+    return best
+
+
+def best_subset_grow(geoms1, geoms2, inter, additive, num_starts=3):
+    # 크기 제한 초과 또는 같은 쪽 폴리곤끼리 겹치는 경우의 greedy
+    # IoU가 큰 poly1 하나에서 시작해 IoU가 가장 커지는 poly1을 하나씩 추가 (poly2 쪽은 매번 best_partner_subset)
+    area1 = shapely.area(geoms1)
+    area2 = shapely.area(geoms2)
+
+    def evaluate(set1):
+        if additive:
+            iou, set2 = best_partner_subset(inter[set1].sum(axis=0), area2, area1[set1].sum())
+            return iou, set2
+        # 겹치는 경우 poly1 쪽은 실제 union, poly2 쪽 선택은 근사 후 실제 union으로 IoU 계산
+        union1 = union_all(geoms1[set1])
+        _, set2 = best_partner_subset(shapely.area(shapely.intersection(union1, geoms2)), area2, union1.area)
+        if len(set2) == 0:
+            return 0.0, set2
+        return calc_metrics(union1, union_all(geoms2[set2]))[0], set2
+
+    singles = sorted(((evaluate([i]), i) for i in range(len(geoms1))), key=lambda x: -x[0][0])
+    best = {"iou": 0.0, "set1": np.empty(0, dtype=np.int64), "set2": np.empty(0, dtype=np.int64)}
+    for (iou, set2), i in singles[:num_starts]:
+        set1 = [i]
+        while True:
+            grown = [(evaluate(set1 + [k]), k) for k in range(len(geoms1)) if k not in set1]
+            if not grown:
+                break
+            (next_iou, next_set2), k = max(grown, key=lambda x: x[0][0])
+            if next_iou <= iou:
+                break
+            iou, set2 = next_iou, next_set2
+            set1.append(k)
+        if iou > best["iou"]:
+            best.update(iou=iou, set1=np.array(set1, dtype=np.int64), set2=set2)
+    return best
+
+
+def best_subset_match(geoms1, geoms2, max_exact=12, union_area=None):
+    # N:N component에서 IoU가 최대인 (poly1 부분집합, poly2 부분집합)
+    # max_exact: 작은 쪽 폴리곤 수가 이 값 이하이면 최적해 탐색, 초과하면 greedy
+    # union_area: 각 쪽 전체 union 면적 (union_metrics에서 계산한 값, None이면 여기서 계산)
+    # 반환: 부분집합 위치, union 기준 (iou, ol1, ol2), 최적해 보장 여부
+    geoms1 = np.asarray(geoms1)
+    geoms2 = np.asarray(geoms2)
+    inter = shapely.area(shapely.intersection(geoms1[:, None], geoms2[None, :]))
+    area1 = shapely.area(geoms1)
+    area2 = shapely.area(geoms2)
+
+    # 각 쪽이 서로 겹치지 않으면 (수치지도, 대부분의 추론 결과) 면적 합으로 모든 조합을 계산 가능
+    if union_area is None:
+        union_area = (shapely.area(union_all(geoms1)), shapely.area(union_all(geoms2)))
+    additive = all(np.isclose(u, a.sum(), rtol=1e-9) for u, a in zip(union_area, (area1, area2)))
+    exact = additive and min(len(geoms1), len(geoms2)) <= max_exact
+
+    # 작은 쪽을 poly1 자리에 두고 탐색
+    swap = len(geoms1) > len(geoms2)
+    if swap:
+        geoms1, geoms2, inter, area1, area2 = geoms2, geoms1, inter.T, area2, area1
+    if exact:
+        best = best_subset_search(inter, area1, area2)
+    else:
+        best = best_subset_grow(geoms1, geoms2, inter, additive)
+    set1, set2 = np.sort(best["set1"]), np.sort(best["set2"])
+    if swap:
+        geoms1, geoms2, set1, set2 = geoms2, geoms1, set2, set1
+
+    metrics = calc_metrics(union_all(geoms1[set1]), union_all(geoms2[set2]))
+    return {"set1": set1, "set2": set2, "metrics": metrics, "exact": exact}
+
+
+def best_subset_chunk(tasks):
+    return [best_subset_match(geoms1, geoms2, max_exact, union_area) for geoms1, geoms2, max_exact, union_area in tasks]
+
+
+def attach_best_subset_metrics(components, poly1, poly2, workers=1, max_exact=12, union_areas=None):
+    # N:N component별 최적 부분집합(best subset) 쌍의 metric (*_bs)과 포함 여부 (in_bs)
+    # max_exact: 작은 쪽 폴리곤 수가 이 값 이하이면 최적해 탐색, 초과하면 greedy
+    # union_areas: attach_metrics_from_components가 반환한 component별 각 쪽 union 면적 (union을 다시 계산하지 않음)
+    union_areas = union_areas or {}
+    n1 = len(components["poly1_ids"])
+    comp_ptr = components["comp_ptr"]
+    comp_nodes = components["comp_nodes"]
+    rel_comp = component_relations(components)
+
+    node_rows = np.concatenate([
+        pd.Index(poly1["poly1_idx"]).get_indexer(components["poly1_ids"]),
+        pd.Index(poly2["poly2_idx"]).get_indexer(components["poly2_ids"])
+    ])
+    geoms1 = np.asarray(poly1.geometry.values)
+    geoms2 = np.asarray(poly2.geometry.values)
+
+    comp_rows = []
+    nn_comps = np.flatnonzero(rel_comp == "N:N")
+    for comp_idx in nn_comps:
+        nodes = comp_nodes[comp_ptr[comp_idx]:comp_ptr[comp_idx + 1]]
+        comp_rows.append((node_rows[nodes[nodes < n1]], node_rows[nodes[nodes >= n1]]))
+
+    tasks = [(geoms1[r1], geoms2[r2], max_exact, union_areas.get(int(c)))
+             for c, (r1, r2) in zip(nn_comps, comp_rows)]
+    chunks = [tasks[a:b] for a, b in parallel.split_chunks(len(tasks), workers)]
+    results = [m for chunk in parallel.map_chunks(best_subset_chunk, chunks, workers, "process") for m in chunk]
+
+    m1 = np.full((3, len(poly1)), np.nan)
+    m2 = np.full((3, len(poly2)), np.nan)
+    in_best1 = np.zeros(len(poly1), dtype=bool)
+    in_best2 = np.zeros(len(poly2), dtype=bool)
+    for (r1, r2), best in zip(comp_rows, results):
+        m1[:, r1] = np.asarray(best["metrics"], dtype=float)[:, None]
+        m2[:, r2] = np.asarray(best["metrics"], dtype=float)[:, None]
+        in_best1[r1[best["set1"]]] = True
+        in_best2[r2[best["set2"]]] = True
 
-            # 1n: union(poly1) vs each poly2
-            for p2 in p2_set:
-                g2 = poly2.loc[poly2['poly2_idx'] == p2, "geometry"].values[0]
-                iou, ol1, ol2 = calc_metrics(g1_union, g2)
-                poly2.loc[poly2['poly2_idx'] == p2, ["iou_1n", "ol_pl1_1n", "ol_pl2_1n"]] = [iou, ol1, ol2]
-            poly1.loc[poly1['poly1_idx'].isin(p1_set), ["iou_1n", "ol_pl1_1n", "ol_pl2_1n"]] = [iou, ol1, ol2]
+    poly1 = poly1.copy()
+    poly2 = poly2.copy()
+    for poly, m, in_best in ((poly1, m1, in_best1), (poly2, m2, in_best2)):
+        loc = poly.columns.get_loc("ol_pl2_11") + 1
+        for i, col in enumerate(["iou_bs", "ol_pl1_bs", "ol_pl2_bs"]):
+            poly.insert(loc + i, col, m[i])
+        poly.insert(loc + 3, "in_bs", in_best)
+    return poly1, poly2
 
-            # n1: each poly1 vs union(poly2)
-            for p1 in p1_set:
-                g1 = poly1.loc[poly1['poly1_idx'] == p1, "geometry"].values[0]
-                iou, ol1, ol2 = calc_metrics(g1, g2_union)
-                poly1.loc[poly1['poly1_idx'] == p1, ["iou_n1", "ol_pl1_n1", "ol_pl2_n1"]] = [iou, ol1, ol2]
-            poly2.loc[poly2['poly2_idx'].isin(p2_set), ["iou_n1", "ol_pl1_n1", "ol_pl2_n1"]] = [iou, ol1, ol2]
 
-        elif rel == "1:1":
-            p1 = p1_set[0]
-            p2 = p2_set[0]
-            g1 = poly1.loc[poly1['poly1_idx'] == p1, "geometry"].values[0]
-            g2 = poly2.loc[poly2['poly2_idx'] == p2, "geometry"].values[0]
-            iou, ol1, ol2 = calc_metrics(g1, g2)
-            poly1.loc[poly1['poly1_idx'] == p1, ["iou_nn", "ol_pl1_nn", "ol_pl2_nn"]] = [iou, ol1, ol2]
-            poly2.loc[poly2['poly2_idx'] == p2, ["iou_nn", "ol_pl1_nn", "ol_pl2_nn"]] = [iou, ol1, ol2]
+def solve_link_assignment(n1, n2, source, target, iou):
+    # 링크 IoU 합이 최대인 1:1 매칭 (매칭 안 되는 폴리곤 허용)
+    # component끼리는 링크가 없으므로 전체를 하나의 sparse 행렬로 풀면 component별로 푼 것과 같음
+    # 행: poly1 + poly2 dummy, 열: poly2 + poly1 dummy
+    #   poly1-poly2: 2 - iou, poly1-dummy / dummy-poly2: 1.5 (미매칭), dummy-dummy: 1 (링크가 있는 쌍만)
+    #   -> 쌍 매칭 비용 3 - iou < 미매칭 두 개 비용 3 이므로 IoU 합 최대화와 같음 (0은 간선 없음으로 취급되어 사용 안 함)
+    match = np.full(n1 + n2, -1, dtype=np.int64)
+    if len(source) == 0:
+        return match
+
+    i = source
+    j = target - n1
+    ids1 = np.arange(n1)
+    ids2 = np.arange(n2)
+    rows = np.concatenate([i, ids1, n1 + ids2, n1 + j])
+    cols = np.concatenate([j, n2 + ids1, ids2, n2 + i])
+    cost = np.concatenate([2 - iou, np.full(n1, 1.5), np.full(n2, 1.5), np.ones(len(i))])
+    matrix = sparse.coo_matrix((cost, (rows, cols)), shape=(n1 + n2, n2 + n1)).tocsr()
+
+    row_ind, col_ind = csgraph.min_weight_full_bipartite_matching(matrix)
+    matched = (row_ind < n1) & (col_ind < n2)
+    match[row_ind[matched]] = n1 + col_ind[matched]
+    match[n1 + col_ind[matched]] = row_ind[matched]
+    return match
+
+
+def attach_assignment(poly1, poly2, components, links):
+    # 유지된 링크(component 내부) 기준 1:1 매칭 상대 (match_idx)와 IoU (match_iou)
+    poly1_ids = components["poly1_ids"]
+    poly2_ids = components["poly2_ids"]
+    n1 = len(poly1_ids)
+    n2 = len(poly2_ids)
+
+    source = links["source"].to_numpy()
+    target = links["target"].to_numpy()
+    iou = links["iou"].to_numpy()
+    match = solve_link_assignment(n1, n2, source, target, iou)
+
+    # 매칭된 쌍의 IoU (링크 테이블에서 (source, target) 키로 조회)
+    link_key = source * (n1 + n2) + target
+    key_order = np.argsort(link_key)
+    matched1 = np.flatnonzero(match[:n1] >= 0)
+    matched_iou = iou[key_order[np.searchsorted(link_key[key_order], matched1 * (n1 + n2) + match[matched1])]]
+
+    node_partner = np.full(n1 + n2, np.nan)
+    node_iou = np.full(n1 + n2, np.nan)
+    node_partner[matched1] = poly2_ids[match[matched1] - n1]
+    node_partner[match[matched1]] = poly1_ids[matched1]
+    node_iou[matched1] = matched_iou
+    node_iou[match[matched1]] = matched_iou
 
+    poly1 = poly1.copy()
+    poly2 = poly2.copy()
+    rows1 = _lookup_positions(poly1_ids, poly1["poly1_idx"])
+    rows2 = n1 + _lookup_positions(poly2_ids, poly2["poly2_idx"])
+    for poly, rows in ((poly1, rows1), (poly2, rows2)):
+        loc = poly.columns.get_loc("comp_idx")
+        poly.insert(loc, "match_idx", node_partner[rows])
+        poly.insert(loc + 1, "match_iou", node_iou[rows])
     return poly1, poly2
 
 
+def overlap_upper_bounds(geom1, geom2, area1, area2):
+    # 교차 면적 <= min(bbox 교차 면적, area1, area2) 이므로 IoU, ol1의 상한 계산
+    bounds1 = shapely.bounds(geom1)
+    bounds2 = shapely.bounds(geom2)
+    width = np.minimum(bounds1[:, 2], bounds2[:, 2]) - np.maximum(bounds1[:, 0], bounds2[:, 0])
+    height = np.minimum(bounds1[:, 3], bounds2[:, 3]) - np.maximum(bounds1[:, 1], bounds2[:, 1])
+    inter_ub = np.minimum(np.clip(width, 0, None) * np.clip(height, 0, None), np.minimum(area1, area2))
+
+    iou_ub = np.divide(inter_ub, area1 + area2 - inter_ub, out=np.ones_like(inter_ub), where=area1 + area2 - inter_ub > 0)
+    ol1_ub = np.divide(inter_ub, area1, out=np.ones_like(inter_ub), where=area1 > 0)
+    return iou_ub, ol1_ub
+
+
+def geometry_keys(geoms, snap_precision=None):
+    # 정규화 WKB: 꼭짓점 시작점/방향만 다른 같은 도형도 같은 값 (snap_precision 지정 시 좌표 격자 스냅 후)
+    geoms = np.asarray(geoms)
+    if snap_precision:
+        geoms = shapely.set_precision(geoms, snap_precision)
+    return shapely.to_wkb(shapely.normalize(geoms))
+
+
+def identical_pairs(geom1, geom2, snap_precision=None):
+    # 링크별 두 geometry가 같은 도형인지 (WKB 해시로 먼저 거르고 바이트 비교로 확정)
+    keys1 = geometry_keys(geom1, snap_precision)
+    keys2 = geometry_keys(geom2, snap_precision)
+    same = pd.util.hash_array(keys1) == pd.util.hash_array(keys2)
+    same[same] = keys1[same] == keys2[same]
+    return same
+
+
+def compute_pair_overlaps(poly1, poly2, p1_ids, p2_ids, workers=1, prune_threshold=None,
+                          identical=False, snap_precision=None):
+    # prune_threshold: 상한으로 봐도 cut될 링크(iou < threshold, ol1 < 0.7)는 overlay 생략 (metric은 NaN)
+    # identical: 같은 도형인 링크는 overlay 없이 inter = union = 면적 (IoU 1)
+    # poly_idx -> 행 위치 (없으면 -1)
+    rows1 = pd.Index(poly1["poly1_idx"]).get_indexer(p1_ids)
+    rows2 = pd.Index(poly2["poly2_idx"]).get_indexer(p2_ids)
+
+    missing = (rows1 < 0) | (rows2 < 0)
+    if missing.any():
+        i = np.flatnonzero(missing)[0]
+        raise ValueError(f"Missing poly1_idx {p1_ids[i]} or poly2_idx {p2_ids[i]} in geometry.")
+
+    # 링크 순서대로 정렬된 geometry 배열
+    geom1 = np.asarray(poly1.geometry.values)[rows1]
+    geom2 = np.asarray(poly2.geometry.values)[rows2]
+
+    empty = shapely.is_empty(geom1) | shapely.is_empty(geom2)
+    if empty.any():
+        i = np.flatnonzero(empty)[0]
+        raise ValueError(f"Empty geometry at poly1_idx {p1_ids[i]} or poly2_idx {p2_ids[i]}.")
+
+    area1 = shapely.area(geom1)
+    area2 = shapely.area(geom2)
+
+    exact = np.ones(len(geom1), dtype=bool)
+    if prune_threshold is not None:
+        # 부동소수 오차로 경계값 링크가 잘못 제외되지 않도록 상한에 여유를 둠
+        iou_ub, ol1_ub = overlap_upper_bounds(geom1, geom2, area1, area2)
+        exact = (iou_ub * (1 + 1e-9) >= prune_threshold) | (ol1_ub * (1 + 1e-9) >= 0.7)
+
+    same = np.zeros(len(geom1), dtype=bool)
+    if identical:
+        same = identical_pairs(geom1, geom2, snap_precision)
+        exact &= ~same
+    exact_pos = np.flatnonzero(exact)
+
+    # 링크 구간별로 나눠 스레드에서 overlay (shapely 배열 연산은 GIL 해제)
+    def overlay_areas(bounds):
+        part = exact_pos[bounds[0]:bounds[1]]
+        return (shapely.area(shapely.intersection(geom1[part], geom2[part])),
+                shapely.area(shapely.union(geom1[part], geom2[part])))
+
+    results = parallel.map_chunks(overlay_areas, parallel.split_chunks(len(exact_pos), workers), workers, "thread")
+    inter_area = np.full(len(geom1), np.nan)
+    union_area = np.full(len(geom1), np.nan)
+    if results:
+        inter_area[exact_pos] = np.concatenate([r[0] for r in results])
+        union_area[exact_pos] = np.concatenate([r[1] for r in results])
+    inter_area[same] = area1[same]
+    union_area[same] = area1[same]
+    measured = exact | same
+
+    no_overlap = measured & ((union_area == 0) | (inter_area == 0))
+    if no_overlap.any():
+        i = np.flatnonzero(no_overlap)[0]
+        raise ValueError(f"No valid overlap between {p1_ids[i]} and {p2_ids[i]}.")
+
+    ol1 = np.divide(inter_area, area1, out=np.where(measured, 0.0, np.nan), where=area1 > 0)
+    ol2 = np.divide(inter_area, area2, out=np.where(measured, 0.0, np.nan), where=area2 > 0)
+    # 같은 도형은 snap 전 면적이 달라도 IoU 1과 맞춰 ol2도 1 (area2 기준이면 1을 넘을 수 있음)
+    ol2[same] = 1.0
+
+    # 링크별 overlap 테이블 (한 번만 계산해서 energy, cut, metric 단계에서 재사용)
+    return pd.DataFrame({
+        "inter_area": inter_area,
+        "union_area": union_area,
+        "area1": area1,
+        "area2": area2,
+        "iou": inter_area / union_area,
+        "ol1": ol1,
+        "ol2": ol2
+    })
+
+
+def connected_component_labels(num_nodes, source, target, parent=None):
+    # union-find: 각 노드의 parent는 항상 자신보다 작거나 같은 노드
+    # parent를 넘기면 기존 연결 상태에 링크를 추가 (threshold sweep용)
+    parent = np.arange(num_nodes, dtype=np.int64) if parent is None else parent.copy()
+    source = np.asarray(source, dtype=np.int64)
+    target = np.asarray(target, dtype=np.int64)
+
+    while True:
+        # 경로 압축
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+        root_s = parent[source]
+        root_t = parent[target]
+        diff = root_s != root_t
+        if not diff.any():
+            return parent
+
+        # 큰 root를 작은 root에 연결
+        hi = np.maximum(root_s[diff], root_t[diff])
+        lo = np.minimum(root_s[diff], root_t[diff])
+        np.minimum.at(parent, hi, lo)
+
+
+def build_components(poly1_ids, poly2_ids, source, target):
+    roots = connected_component_labels(len(poly1_ids) + len(poly2_ids), source, target)
+    return components_from_roots(poly1_ids, poly2_ids, roots)
+
+
+def components_from_roots(poly1_ids, poly2_ids, roots):
+    num_nodes = len(roots)
+    # root는 component 내 최소 노드이므로 root 순서 = component 순서
+    _, node_comp = np.unique(roots, return_inverse=True)
+    node_comp = node_comp.astype(np.int64)
+    num_components = int(node_comp.max()) + 1 if num_nodes > 0 else 0
+
+    # CSR: component별 노드 (노드 번호 오름차순)
+    comp_nodes = np.argsort(node_comp, kind="stable")
+    comp_ptr = np.zeros(num_components + 1, dtype=np.int64)
+    np.cumsum(np.bincount(node_comp, minlength=num_components), out=comp_ptr[1:])
+
+    return {
+        "poly1_ids": poly1_ids,
+        "poly2_ids": poly2_ids,
+        "num_components": num_components,
+        "node_comp": node_comp,
+        "comp_ptr": comp_ptr,
+        "comp_nodes": comp_nodes
+    }
+
+
+def subset_components(components, links, comp_ids):
+    # comp_ids(오름차순) component만 남긴 components와 링크 (노드/component 번호는 남은 것끼리 다시 매김)
+    # links: 남길 component의 유지된 링크 (source, target, comp_idx는 전체 기준)
+    # component 순서(최소 노드 순)는 그대로이므로 새 번호 k의 전체 번호는 comp_ids[k]
+    n1 = len(components["poly1_ids"])
+    comp_ptr = components["comp_ptr"]
+    comp_nodes = components["comp_nodes"]
+    counts = comp_ptr[comp_ids + 1] - comp_ptr[comp_ids]
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    nodes = np.sort(comp_nodes[np.repeat(comp_ptr[comp_ids], counts) + offsets])
+
+    # root: component의 최소 노드 (comp_nodes는 component 안에서 노드 번호 오름차순)
+    roots = np.searchsorted(nodes, comp_nodes[comp_ptr[components["node_comp"][nodes]]])
+    sub_components = components_from_roots(components["poly1_ids"][nodes[nodes < n1]],
+                                           components["poly2_ids"][nodes[nodes >= n1] - n1], roots)
+    sub_links = links.assign(
+        source=np.searchsorted(nodes, links["source"].to_numpy()),
+        target=np.searchsorted(nodes, links["target"].to_numpy()),
+        comp_idx=np.searchsorted(comp_ids, links["comp_idx"].to_numpy())
+    ).reset_index(drop=True)
+    return sub_components, sub_links
+
+
+def group_positions(keys):
+    # key별 위치 {key: 위치 배열 (오름차순)}
+    order = np.argsort(keys, kind="stable")
+    values, starts = np.unique(keys[order], return_index=True)
+    return dict(zip(values.tolist(), np.split(order, starts[1:])))
+
+
+def component_sets(components):
+    poly1_ids = components["poly1_ids"]
+    poly2_ids = components["poly2_ids"]
+    n1 = len(poly1_ids)
+    num_components = components["num_components"]
+    node_comp = components["node_comp"]
+
+    # component 순서로 정렬된 poly_idx를 component 경계에서 분할
+    def split_by_component(comp_of_node, ids):
+        order = np.argsort(comp_of_node, kind="stable")
+        bounds = np.cumsum(np.bincount(comp_of_node, minlength=num_components))[:-1]
+        return [part.tolist() for part in np.split(ids[order], bounds)]
+
+    return split_by_component(node_comp[:n1], poly1_ids), split_by_component(node_comp[n1:], poly2_ids)
+
+
+def components_to_dict(components):
+    poly1_sets, poly2_sets = component_sets(components)
+    return {
+        comp_idx: {"poly1_set": p1_set, "poly2_set": p2_set}
+        for comp_idx, (p1_set, p2_set) in enumerate(zip(poly1_sets, poly2_sets))
+    }
+
+
+def _lookup_positions(sorted_ids, values):
+    values = np.asarray(values, dtype=np.int64)
+    pos = np.searchsorted(sorted_ids, values)
+    if len(values) > 0 and (pos.max() >= len(sorted_ids) or not np.array_equal(sorted_ids[pos], values)):
+        raise ValueError("poly_idx not found in components.")
+    return pos
+
+
 def reorder_columns_after_cut_link(df):
     target_cols = ["comp_idx", "poly1_set", "poly2_set", "rel_cd", "class_10", "cd_class", "gt_class", "cd_status"]
 
@@ -1,9 +1,11 @@
 import argparse
-import pandas as pd
-from src.utils import io
+from src.utils import io, instrument
 from src.utils import evaluation_utils
 from src.core.polygon_matching import polygon_matching_utils
 from src.common.path_loader import load_building_paths
+from src.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 
 def decide_confusion_matrix(gt_prev, gt_cur, cd_prev, cd_cur):
@@ -12,7 +14,8 @@ def decide_confusion_matrix(gt_prev, gt_cur, cd_prev, cd_cur):
     new_temp = evaluation_utils.filter_new(gt_cur, cd_cur)
     new = evaluation_utils.compare_gt_cd_new(new_temp)
     confusion_matrix = pd.concat([removed_updated_unchanged, new], ignore_index=True)
-    confusion_matrix = confusion_matrix.sort_values(by='gt_idx', ascending=True).reset_index(drop=True)
+    # gt_idx가 같은 행(이전/현재 수치지도 idx가 겹치는 경우, 신축 FP의 NaN)은 concat 순서 유지
+    confusion_matrix = confusion_matrix.sort_values(by='gt_idx', ascending=True, kind='stable').reset_index(drop=True)
     cd_prev, cd_cur = polygon_matching_utils.confusion_matrix_to_cd(cd_prev, cd_cur, confusion_matrix)
     return confusion_matrix, cd_prev, cd_cur
 
@@ -59,19 +62,27 @@ def evaluate_cd(confusion_matrix):
     return df
 
 
-def cd_evaluate_pipeline(gt_prev_path, gt_cur_path, cd_prev_path, cd_cur_path, output_path):
-    gt_prev = io.import_shapefile(gt_prev_path, crs=5186)
-    gt_cur = io.import_shapefile(gt_cur_path, crs=5186)
+def cd_evaluate_pipeline(gt_prev_path, gt_cur_path, cd_prev_path, cd_cur_path, output_path, cd_prev_output_path,
+                         cd_cur_output_path, persist=True):
+    # 입력은 파일 경로 또는 GeoDataFrame, persist=False: GT를 붙인 dmap/seg는 저장하지 않고 반환만
+    # GT를 붙인 dmap/seg는 Detect Change 결과(입력)와 다른 경로에 저장 (입력을 덮어쓰면 다시 실행할 때 GT 열이 중복됨)
+    # GT는 비교에 쓰는 열만 읽기
+    gt_prev = io.import_shapefile(gt_prev_path, crs=5186, columns=["poly1_idx", "gt_class"])
+    gt_cur = io.import_shapefile(gt_cur_path, crs=5186, columns=["poly2_idx", "gt_class"])
     cd_prev = io.import_shapefile(cd_prev_path, crs=5186)
     cd_cur = io.import_shapefile(cd_cur_path, crs=5186)
-    confusion_matrix, cd_prev, cd_cur = decide_confusion_matrix(gt_prev, gt_cur, cd_prev, cd_cur)
+    with instrument.span("classify", rows1=len(cd_prev), rows2=len(cd_cur)) as counts:
+        confusion_matrix, cd_prev, cd_cur = decide_confusion_matrix(gt_prev, gt_cur, cd_prev, cd_cur)
+        counts["confusion_rows"] = len(confusion_matrix)
     cd_prev = polygon_matching_utils.reorder_columns_after_cut_link(cd_prev)
     cd_cur = polygon_matching_utils.reorder_columns_after_cut_link(cd_cur)
     cd_evaluate_report = evaluate_cd(confusion_matrix)
-    io.export_file(cd_prev, cd_prev_path, 'dmap')
-    io.export_file(cd_cur, cd_cur_path, 'seg')
+    if persist:
+        io.export_file(cd_prev, cd_prev_output_path, 'dmap')
+        io.export_file(cd_cur, cd_cur_output_path, 'seg')
     io.export_file(confusion_matrix, output_path, 'cd_evaluate_result')
     io.export_file(cd_evaluate_report, output_path, 'cd_evaluate_result')
+    return cd_prev, cd_cur
 
 
 def main():
@@ -89,8 +100,11 @@ def main():
         gt_cur_path=paths["GT_of_building_change_detection_cur"],
         cd_prev_path=paths["building_change_detection_result_prev"],
         cd_cur_path=paths["building_change_detection_result_cur"],
-        output_path=paths["evaluation_of_building_change_detection"]
+        output_path=paths["evaluation_of_building_change_detection"],
+        cd_prev_output_path=paths["evaluation_of_building_change_detection_prev"],
+        cd_cur_output_path=paths["evaluation_of_building_change_detection_cur"]
     )
+    io.flush_exports()
 
 
 if __name__ == "__main__":
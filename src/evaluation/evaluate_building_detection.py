@@ -1,9 +1,13 @@
 import argparse
-from src.utils import io
+from src.utils import io, instrument
 from src.utils import analysis_utils
 from src.core.polygon_matching import polygon_matching_utils, polygon_matching_algorithm
 from src.utils import evaluation_utils
-from src.common.path_loader import load_building_paths
+from src.common.path_loader import load_building_paths, load_artifact_format
+from src.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 
 def assign_class(dmap, seg, bd_threshold):
@@ -14,15 +18,20 @@ def assign_class(dmap, seg, bd_threshold):
     return dmap, seg
 
 
-def evaluate_bd_pipeline(dmap_path, seg_path, dmap_output_path, seg_output_path, anl_output_path, eval_output_path, cut_threshold, bd_threshold):
+def evaluate_bd_pipeline(dmap_path, seg_path, dmap_output_path, seg_output_path, anl_output_path, eval_output_path, cut_threshold, bd_threshold, tile_size=None, workers=1, cache_dir=None, matching="union", artifact_format="shapefile", persist=True):
+    # dmap_path, seg_path: 파일 경로 또는 GeoDataFrame
+    # persist=False: gt/predict는 저장하지 않고 반환만 (main의 artifact 저장소가 저장)
     _, dmap, seg = (polygon_matching_algorithm.algorithm_pipeline
-                             (dmap_path, seg_path, anl_output_path, cut_threshold))
-    dmap, seg = assign_class(dmap, seg, bd_threshold)
+                             (dmap_path, seg_path, anl_output_path, cut_threshold, tile_size, workers, cache_dir,
+                              matching=matching))
+    with instrument.span("classify", rows1=len(dmap), rows2=len(seg)):
+        dmap, seg = assign_class(dmap, seg, bd_threshold)
     cols_to_drop = [
         'iou_nn', 'ol_pl1_nn', 'ol_pl2_nn',
         'iou_1n', 'ol_pl1_1n', 'ol_pl2_1n',
         'iou_n1', 'ol_pl1_n1', 'ol_pl2_n1',
         'iou_11', 'ol_pl1_11', 'ol_pl2_11',
+        'iou_bs', 'ol_pl1_bs', 'ol_pl2_bs', 'in_bs',
         'comp_idx', 'poly1_set', 'poly2_set', 'cut_link'
     ]
 
@@ -32,10 +41,53 @@ def evaluate_bd_pipeline(dmap_path, seg_path, dmap_output_path, seg_output_path,
     seg = seg.drop(columns=[col for col in cols_to_drop if col in seg.columns])
     dmap = dmap.rename(columns={"Relation": "rel_bd"})
     seg = seg.rename(columns={"Relation": "rel_bd"})
-    io.export_file(dmap, dmap_output_path, 'gt')
-    io.export_file(seg, seg_output_path, 'predict')
+    # gt/predict는 다음 단계(Detect Change)가 읽는 중간 산출물
+    if persist:
+        io.export_file(dmap, dmap_output_path, 'gt', artifact_format)
+        io.export_file(seg, seg_output_path, 'predict', artifact_format)
     io.export_file(anl_result, anl_output_path, 'bd_anl_result')
     io.export_file(result, eval_output_path, 'bd_evaluate_result')
+    return dmap, seg
+
+
+def sweep_bd_pipeline(dmap_path, seg_path, eval_output_path, cut_thresholds, bd_threshold, tile_size=None, workers=1):
+    # 그래프/overlap은 한 번만 계산하고 cut_threshold별 component, relation 수, 탐지 성능만 산출
+    dmap, seg, graph = polygon_matching_algorithm.build_matching_graph(
+        dmap_path, seg_path, tile_size, workers, prune_threshold=min(cut_thresholds))
+    if tile_size:
+        dmap, seg = polygon_matching_algorithm.read_linked_geometries(dmap_path, seg_path, graph)
+    sweep = polygon_matching_algorithm.sweep_cut_thresholds(dmap, seg, graph, cut_thresholds, workers)
+
+    n1 = len(graph["poly1_ids"])
+    rows = []
+    dmap_comp = pd.DataFrame({"poly1_idx": graph["poly1_ids"]})
+    seg_comp = pd.DataFrame({"poly2_idx": graph["poly2_ids"]})
+    for step in sweep:
+        components = step["components"]
+        node_comp = components["node_comp"]
+        cnt1 = np.bincount(node_comp[:n1], minlength=components["num_components"])
+        cnt2 = np.bincount(node_comp[n1:], minlength=components["num_components"])
+
+        # 같은 component의 폴리곤은 모두 같은 union IoU로 TP/FN(FP) 판정 (assign_class와 동일)
+        detected = step["union_iou"] > bd_threshold
+        relation_counts = pd.Series(step["relation"]).value_counts()
+        rows.append({
+            "cut_threshold": step["cut_threshold"],
+            "component 수": components["num_components"],
+            "cut 링크 수": step["num_cut_links"],
+            "재계산 component 수": step["recomputed"],
+            **{rel: int(relation_counts.get(rel, 0)) for rel in ["1:1", "1:N", "N:1", "N:N", "1:0", "0:1"]},
+            **evaluation_utils.bd_scores(cnt1[detected].sum(), cnt1[~detected].sum(),
+                                         cnt2[detected].sum(), cnt2[~detected].sum(), bd_threshold)
+        })
+        dmap_comp[f"comp_{step['cut_threshold']}"] = node_comp[:n1]
+        seg_comp[f"comp_{step['cut_threshold']}"] = node_comp[n1:]
+
+    result = pd.DataFrame(rows)
+    io.export_file(result, eval_output_path, 'bd_cut_sweep_result')
+    io.export_file(dmap_comp, eval_output_path, 'bd_cut_sweep_gt_components')
+    io.export_file(seg_comp, eval_output_path, 'bd_cut_sweep_predict_components')
+    return result
 
 
 def main():
@@ -45,11 +97,32 @@ def main():
     parser.add_argument("--previous_year", type=str, default=2020, help="이전 연도")
     parser.add_argument("--cut_threshold", type=float, default=0.05, help="그래프 컷 임계값")
     parser.add_argument("--bd_threshold", type=float, default=0.6, help="탐지 판별 임계값")
+    parser.add_argument("--tile_size", type=float, default=None, help="타일 크기 (m, 지정 시 타일 단위 매칭)")
+    parser.add_argument("--workers", type=int, default=1, help="병렬 worker 수 (-1: CPU 코어 수)")
+    parser.add_argument("--use_cache", action="store_true", help="매칭 결과 캐시 사용 (config의 matching_cache 경로)")
+    parser.add_argument("--matching", type=str, default="union", choices=["union", "assignment"],
+                        help="매칭 방식 (assignment: 링크 IoU 기준 1:1 매칭 상대 match_idx, match_iou 추가)")
+    parser.add_argument("--sweep_thresholds", type=str, default=None,
+                        help="그래프 컷 임계값 목록 (예: 0.01,0.05,0.1, 지정 시 한 번에 threshold별 성능만 계산)")
 
     args = parser.parse_args()
 
     paths = load_building_paths(args.region, args.year, args.previous_year)
 
+    if args.sweep_thresholds:
+        result = sweep_bd_pipeline(
+            dmap_path=paths["GT_of_building_detection"],
+            seg_path=paths["building_inference"],
+            eval_output_path=paths["evaluation_of_building_detection"],
+            cut_thresholds=[float(t) for t in args.sweep_thresholds.split(",")],
+            bd_threshold=args.bd_threshold,
+            tile_size=args.tile_size,
+            workers=args.workers
+        )
+        io.flush_exports()
+        print(result.to_string(index=False))
+        return
+
     evaluate_bd_pipeline(
         dmap_path=paths["GT_of_building_detection"],
         seg_path=paths["building_inference"],
@@ -58,8 +131,14 @@ def main():
         anl_output_path=paths["evaluation_of_building_detection_anl"],
         eval_output_path=paths["evaluation_of_building_detection"],
         cut_threshold=args.cut_threshold,
-        bd_threshold=args.bd_threshold
+        bd_threshold=args.bd_threshold,
+        tile_size=args.tile_size,
+        workers=args.workers,
+        cache_dir=paths["matching_cache"] if args.use_cache else None,
+        matching=args.matching,
+        artifact_format=load_artifact_format()
     )
+    io.flush_exports()
 
 
 if __name__ == "__main__":
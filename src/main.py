@@ -1,107 +1,197 @@
-import pandas as pd
 import warnings
 import time
 from src.common import path_config
 from src.common import input_parameter
 from src.common import pipeline_step_selector
+from src.common.path_loader import load_artifact_format
+from src.utils import io, cache, artifacts, instrument
 from src.core.building_change_detection import detect_building_change
 from src.core.map_validation import create_change_detection_gt
 from src.evaluation import evaluate_building_change_detection, evaluate_building_detection
+from src.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
-warnings.simplefilter(action='ignore', category=pd.errors.SettingWithCopyWarning)
 
 
-def run_pipeline(region, year, previous_year, selected_indices):
-    # 경로 설정
-    path_config.save_last_selection(region, year, previous_year)
+# 단계별 임계값 기본값 (cut: 그래프 컷 임계값, 나머지: 탐지/변화 판별 임계값)
+default_thresholds = {
+    "bd_cut_threshold": 0.05,
+    "bd_threshold": 0.6,
+    "cd_cut_threshold": 0.05,
+    "cd_threshold": 0.7,
+    "gt_cut_threshold": 0.05,
+    "gt_cd_threshold": 0.95
+}
+
+
+def run_pipeline(region, year, previous_year, selected_indices, thresholds=None, force=False, instrument_log=None,
+                 profile_span=None):
+    # thresholds: default_thresholds 중 바꿀 값만 지정
+    # force: 입력과 파라미터가 마지막 성공 실행과 같아도 선택한 단계 모두 실행
+    # instrument_log: 구간별 계측 기록(JSON lines) 경로, profile_span: cProfile로 실행할 구간 이름
+    # pandas는 실행 시점에 import (import만 하는 --help 등에서는 불러오지 않음)
+    warnings.simplefilter(action='ignore', category=pd.errors.SettingWithCopyWarning)
+    instrument.configure(instrument_log, profile_span, region=region, year=year, previous_year=previous_year)
+    # (last_selection.json 저장은 대화형 실행부에서만, 여러 process가 동시에 실행해도 파일을 쓰지 않음)
+    thresholds = {**default_thresholds, **(thresholds or {})}
     paths = path_config.load_paths(region, year, previous_year)
+    artifact_format = load_artifact_format()
+    # 단계 사이 결과는 메모리로 전달하고 디스크 저장은 백그라운드에서 진행 (입력 파일은 실행당 한 번만 읽음)
+    store = artifacts.new_store(paths)
 
     def detect_building():
         print(f"\n▶ 지역: {region} 시작")
         start_time = time.time()
-        evaluate_building_detection.evaluate_bd_pipeline(
-            paths['GT_of_building_detection'],
-            paths['building_inference'],
+        gt, predict = evaluate_building_detection.evaluate_bd_pipeline(
+            artifacts.get(store, 'GT_of_building_detection'),
+            artifacts.get(store, 'building_inference'),
             paths['evaluation_of_building_detection_gt'],
             paths['evaluation_of_building_detection_predict'],
             paths['evaluation_of_building_detection_anl'],
             paths['evaluation_of_building_detection'],
-            0.05,
-            0.6
+            thresholds['bd_cut_threshold'],
+            thresholds['bd_threshold'],
+            cache_dir=paths['matching_cache'],
+            artifact_format=artifact_format,
+            persist=False
         )
+        artifacts.publish(store, 'evaluation_of_building_detection_gt', gt, 'gt', artifact_format)
+        artifacts.publish(store, 'evaluation_of_building_detection_predict', predict, 'predict', artifact_format)
         print(f"Evaluate Building Detection - 완료 ({time.time() - start_time:.2f}초)")
 
     def validate_change_detection():
         print(f"\n▶ 지역: {region} 시작")
         start_time = time.time()
-        create_change_detection_gt.cd_pipeline(
-            paths['previous_building_digital_map'],
-            paths['GT_of_building_detection'],
+        prev, cur = create_change_detection_gt.cd_pipeline(
+            artifacts.get(store, 'previous_building_digital_map'),
+            artifacts.get(store, 'GT_of_building_detection'),
             paths['GT_of_building_change_detection_prev'],
             paths['GT_of_building_change_detection_cur'],
             paths['GT_of_building_change_detection_anl'],
-            0.05,
-            0.95
+            thresholds['gt_cut_threshold'],
+            thresholds['gt_cd_threshold'],
+            cache_dir=paths['matching_cache'],
+            artifact_format=artifact_format,
+            persist=False
         )
+        artifacts.publish(store, 'GT_of_building_change_detection_prev', prev, 'prev_dmap_add_error', artifact_format)
+        artifacts.publish(store, 'GT_of_building_change_detection_cur', cur, 'cur_dmap_add_error', artifact_format)
         print(f"Create Building Change Detection GT - 완료 ({time.time() - start_time:.2f}초)")
 
     def detect_change():
         print(f"\n▶ 지역: {region} 시작")
         start_time = time.time()
-        detect_building_change.cd_pipeline(
-            paths['previous_building_digital_map'],
-            paths['evaluation_of_building_detection_predict'],
+        dmap, seg = detect_building_change.cd_pipeline(
+            artifacts.get(store, 'previous_building_digital_map'),
+            artifacts.get(store, 'evaluation_of_building_detection_predict'),
             paths['building_change_detection_result_prev'],
             paths['building_change_detection_result_cur'],
             paths['building_change_detection_result_anl'],
-            0.05,
-            0.7
+            thresholds['cd_cut_threshold'],
+            thresholds['cd_threshold'],
+            cache_dir=paths['matching_cache'],
+            persist=False
         )
+        artifacts.publish(store, 'building_change_detection_result_prev', dmap, 'dmap')
+        artifacts.publish(store, 'building_change_detection_result_cur', seg, 'seg')
         print(f"Detect Change - 완료 ({time.time() - start_time:.2f}초)")
 
     def evaluate_change_detection():
         print(f"\n▶ 지역: {region} 시작")
         start_time = time.time()
-        evaluate_building_change_detection.cd_evaluate_pipeline(
-            paths['GT_of_building_change_detection_prev'],
-            paths['GT_of_building_change_detection_cur'],
-            paths['building_change_detection_result_prev'],
-            paths['building_change_detection_result_cur'],
-            paths['evaluation_of_building_change_detection']
+        dmap, seg = evaluate_building_change_detection.cd_evaluate_pipeline(
+            artifacts.get(store, 'GT_of_building_change_detection_prev', columns=["poly1_idx", "gt_class"]),
+            artifacts.get(store, 'GT_of_building_change_detection_cur', columns=["poly2_idx", "gt_class"]),
+            artifacts.get(store, 'building_change_detection_result_prev'),
+            artifacts.get(store, 'building_change_detection_result_cur'),
+            paths['evaluation_of_building_change_detection'],
+            paths['evaluation_of_building_change_detection_prev'],
+            paths['evaluation_of_building_change_detection_cur'],
+            persist=False
         )
+        artifacts.publish(store, 'evaluation_of_building_change_detection_prev', dmap, 'dmap')
+        artifacts.publish(store, 'evaluation_of_building_change_detection_cur', seg, 'seg')
         print(f"Evaluate Change Detection - 완료 ({time.time() - start_time:.2f}초)")
 
 
+    # 단계별 입력/출력 경로 key와 결과에 영향을 주는 파라미터 (의존 관계와 생략 여부 판단에 사용)
     pipeline_steps = [
-        ("Evaluate Building Detection", detect_building),
-        ("Detect Change", detect_change),
-        ("Evaluate Change Detection", evaluate_change_detection),
-        ("Dmap vs Dmap", validate_change_detection)    ]
-
-    pipeline_step_selector.run_selected_pipeline_steps(pipeline_steps, selected_indices)
+        {
+            "name": "Evaluate Building Detection",
+            "func": detect_building,
+            "inputs": ['GT_of_building_detection', 'building_inference'],
+            "outputs": ['evaluation_of_building_detection_gt', 'evaluation_of_building_detection_predict',
+                        'evaluation_of_building_detection_anl', 'evaluation_of_building_detection'],
+            "params": {"cut_threshold": thresholds['bd_cut_threshold'], "bd_threshold": thresholds['bd_threshold'],
+                       "artifact_format": artifact_format}
+        },
+        {
+            "name": "Detect Change",
+            "func": detect_change,
+            "inputs": ['previous_building_digital_map', 'evaluation_of_building_detection_predict'],
+            "outputs": ['building_change_detection_result_prev', 'building_change_detection_result_cur',
+                        'building_change_detection_result_anl'],
+            "params": {"cut_threshold": thresholds['cd_cut_threshold'], "cd_threshold": thresholds['cd_threshold']}
+        },
+        {
+            # Detect Change 결과(dmap/seg)에 GT를 붙여 별도 경로에 저장 (입력은 다시 쓰지 않음)
+            "name": "Evaluate Change Detection",
+            "func": evaluate_change_detection,
+            "inputs": ['GT_of_building_change_detection_prev', 'GT_of_building_change_detection_cur',
+                       'building_change_detection_result_prev', 'building_change_detection_result_cur'],
+            "outputs": ['evaluation_of_building_change_detection_prev', 'evaluation_of_building_change_detection_cur',
+                        'evaluation_of_building_change_detection'],
+            "params": {}
+        },
+        {
+            "name": "Dmap vs Dmap",
+            "func": validate_change_detection,
+            "inputs": ['previous_building_digital_map', 'GT_of_building_detection'],
+            "outputs": ['GT_of_building_change_detection_prev', 'GT_of_building_change_detection_cur',
+                        'GT_of_building_change_detection_anl'],
+            "params": {"cut_threshold": thresholds['gt_cut_threshold'], "cd_threshold": thresholds['gt_cd_threshold'],
+                       "artifact_format": artifact_format}
+        }
+    ]
+
+    step_times = pipeline_step_selector.run_pipeline_dag(pipeline_steps, selected_indices, paths,
+                                                         paths['pipeline_state'], force=force)
+
+    stats = cache.stats(paths['matching_cache'])
+    print(f"매칭 캐시: hit {stats['hits']}, miss {stats['misses']}, "
+          f"eviction {stats['evictions']}, 크기 {stats['size_bytes'] / 1024 ** 2:.1f}MB")
+    return step_times
 
 
 # ----------- 메인 실행부 -----------
 
-last_selection = path_config.load_last_selection()
-region = path_config.select_region()
-year = path_config.select_year("연도를 입력하세요", last_selection, 'year')
-previous_year = path_config.select_year("이전 연도를 입력하세요", last_selection, 'previous_year')
-
-gt_min_area, gt_max_area, gt_refine_categories, detection_threshold, detection_area, change_detection_area_range = \
-    input_parameter.get_multiple_inputs_with_defaults()
-
-pipeline_steps = [
-    ("Evaluate Building Detection", None),
-    ("Detect Change", None),
-    ("Evaluate Change Detection", None),
-    ("Create Building Change Detection GT", None)]
-selected_indices = pipeline_step_selector.get_selected_pipeline_indices(pipeline_steps)
-
-# 지역 처리
-if region == "all":
-    for r in path_config.regions:
-        run_pipeline(r, year, previous_year, selected_indices)
-else:
-    run_pipeline(region, year, previous_year, selected_indices)
+# process worker가 이 모듈을 다시 import해도 입력 프롬프트가 실행되지 않도록 보호
+if __name__ == "__main__":
+    last_selection = path_config.load_last_selection()
+    region = path_config.select_region()
+    year = path_config.select_year("연도를 입력하세요", last_selection, 'year')
+    previous_year = path_config.select_year("이전 연도를 입력하세요", last_selection, 'previous_year')
+    path_config.save_last_selection(region, year, previous_year)
+
+    gt_min_area, gt_max_area, gt_refine_categories, detection_threshold, detection_area, change_detection_area_range = \
+        input_parameter.get_multiple_inputs_with_defaults()
+
+    pipeline_steps = [
+        ("Evaluate Building Detection", None),
+        ("Detect Change", None),
+        ("Evaluate Change Detection", None),
+        ("Create Building Change Detection GT", None)]
+    selected_indices = pipeline_step_selector.get_selected_pipeline_indices(pipeline_steps)
+    thresholds = {"bd_threshold": detection_threshold}
+
+    # 지역 처리
+    if region == "all":
+        for r in path_config.regions:
+            run_pipeline(r, year, previous_year, selected_indices, thresholds)
+    else:
+        run_pipeline(region, year, previous_year, selected_indices, thresholds)
+
+    # 결과 파일 저장은 백그라운드에서 진행되므로 (다음 지역 계산과 겹침) 마지막에 완료 대기
+    io.flush_exports()
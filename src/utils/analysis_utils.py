@@ -1,4 +1,6 @@
-import pandas as pd
+from src.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 
 def report_class_10(poly1, poly2):
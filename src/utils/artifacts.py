@@ -0,0 +1,44 @@
+import threading
+from src.utils import io
+
+'''
+pipeline 단계 사이 GeoDataFrame을 메모리로 전달하는 artifact 저장소 (지역 단위 실행마다 하나)
+- key: config.json의 building 경로 이름 (예: evaluation_of_building_detection_predict)
+- get: 메모리에 있으면 사본을, 없으면 해당 경로에서 한 번만 읽어 보관 (같은 입력을 단계마다 다시 읽지 않음)
+- publish: 단계 결과를 메모리에 등록하고 디스크 저장은 io.export_file 백그라운드 저장으로 진행
+  같은 key가 다시 publish되면 아직 시작하지 않은 이전 저장은 취소 (어차피 덮어써질 파일)
+저장 완료 대기와 저장 오류 확인은 io.flush_exports
+'''
+
+
+def new_store(paths):
+    return {
+        "paths": paths,
+        "frames": {},
+        "pending": {},
+        "lock": threading.Lock(),
+        "key_locks": {}
+    }
+
+
+def get(store, key, **kwargs):
+    # kwargs: columns, bbox, fids 등 import_shapefile 옵션 (보관된 frame에 적용)
+    # 동시에 실행되는 단계가 같은 key를 요청해도 한 번만 읽도록 key별 lock
+    with store["lock"]:
+        key_lock = store["key_locks"].setdefault(key, threading.Lock())
+    with key_lock:
+        gdf = store["frames"].get(key)
+        if gdf is None:
+            gdf = io.import_shapefile(store["paths"][key])
+            store["frames"][key] = gdf
+    # 단계가 받은 frame을 수정해도 보관된 frame은 그대로 유지되도록 사본 반환
+    return io.import_shapefile(gdf, **kwargs)
+
+
+def publish(store, key, gdf, file_name, fmt="shapefile"):
+    with store["lock"]:
+        store["frames"][key] = gdf
+        previous = store["pending"].get(key)
+        if previous is not None and previous[1:] == (file_name, fmt):
+            previous[0].cancel()
+        store["pending"][key] = (io.export_file(gdf, store["paths"][key], file_name, fmt), file_name, fmt)
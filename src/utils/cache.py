@@ -0,0 +1,139 @@
+import os
+import json
+import glob
+import pickle
+import hashlib
+import threading
+from src.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+'''
+내용 기반(content-addressed) 디스크 캐시
+- key: 입력 파일 내용 해시 + 파라미터로 만든 sha256
+- 값: pickle 파일 (<cache_dir>/<key>.pkl), 임시 파일에 쓴 뒤 rename
+- 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제
+- hit/miss/eviction 통계는 <cache_dir>/stats.json에 누적
+'''
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+_lock = threading.Lock()
+_fingerprints = {}
+
+
+def fingerprint_file(file_path):
+    # shapefile은 같은 이름의 구성 파일(.shp, .shx, .dbf, .prj, .cpg ...)을 모두 해시
+    if os.path.isdir(file_path):
+        files = sorted(os.path.join(file_path, f) for f in os.listdir(file_path)
+                       if os.path.isfile(os.path.join(file_path, f)))
+    else:
+        stem = os.path.splitext(file_path)[0]
+        files = sorted(glob.glob(glob.escape(stem) + ".*")) or [file_path]
+
+    stat_key = tuple((f, os.path.getsize(f), os.path.getmtime(f)) for f in files)
+    if stat_key in _fingerprints:
+        return _fingerprints[stat_key]
+
+    digest = hashlib.sha256()
+    for f in files:
+        digest.update(os.path.basename(f).encode("utf-8"))
+        with open(f, "rb") as fp:
+            for block in iter(lambda: fp.read(1 << 20), b""):
+                digest.update(block)
+
+    _fingerprints[stat_key] = digest.hexdigest()
+    return _fingerprints[stat_key]
+
+
+def fingerprint_frame(gdf):
+    # 메모리의 GeoDataFrame 내용 해시 (열 이름, 속성 값, geometry WKB, 좌표계)
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(map(str, gdf.columns)), str(gdf.crs)]).encode("utf-8"))
+    attributes = gdf.drop(columns=gdf.geometry.name)
+    for col in attributes.columns:
+        values = attributes[col]
+        if values.dtype == object:
+            values = values.map(repr)  # list 열(poly1_set 등)도 해시 가능하도록 문자열로
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    for wkb in gdf.geometry.to_wkb():
+        digest.update(wkb or b"")
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def load(cache_dir, key):
+    entry_path = os.path.join(cache_dir, f"{key}.pkl")
+    try:
+        with open(entry_path, "rb") as f:
+            value = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        _update_stats(cache_dir, misses=1)
+        return None
+
+    os.utime(entry_path)  # LRU 기준 시간 갱신
+    _update_stats(cache_dir, hits=1)
+    return value
+
+
+def store(cache_dir, key, value, max_bytes=DEFAULT_MAX_BYTES):
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_path = os.path.join(cache_dir, f"{key}.pkl")
+    tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, entry_path)
+
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir, max_bytes=DEFAULT_MAX_BYTES, pattern="*.pkl"):
+    # pattern: 크기 제한 대상 항목 (좌표계 변환 사본 캐시는 "*.parquet")
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, pattern)):
+        try:
+            entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except FileNotFoundError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+
+    _update_stats(cache_dir, evictions=evicted, size_bytes=total)
+
+
+def stats(cache_dir):
+    stats_path = os.path.join(cache_dir, "stats.json")
+    if not os.path.exists(stats_path):
+        return {"hits": 0, "misses": 0, "evictions": 0, "size_bytes": 0}
+    with open(stats_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _update_stats(cache_dir, size_bytes=None, **counts):
+    with _lock:
+        os.makedirs(cache_dir, exist_ok=True)
+        current = stats(cache_dir)
+        for name, count in counts.items():
+            current[name] = current.get(name, 0) + count
+        if size_bytes is not None:
+            current["size_bytes"] = size_bytes
+
+        stats_path = os.path.join(cache_dir, "stats.json")
+        tmp_path = f"{stats_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(current, f)
+        os.replace(tmp_path, stats_path)
@@ -1,6 +1,9 @@
-import pandas as pd
-import geopandas as gpd
 from src.core.polygon_matching import polygon_matching_utils
+from src.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+gpd = lazy_import("geopandas")
 
 
 def compare_gt_cd_remove_updated_unchanged(gt_prev, cd_prev):
@@ -50,23 +53,19 @@ def filter_new(gt_cur, cd_cur):
         cd_filtered = cd_filtered.rename(columns={'poly2_idx': 'cd_idx'})
 
     # 외부 조인 수행
-    joined = polygon_matching_utils.outer_join(gt_filtered, cd_filtered, poly1_prefix="gt", poly2_prefix="cd")
-    joined = joined[["gt_idx", "cd_idx"]]
-
-    # 조건에 따른 geometry 땡겨오기
-    geometries = []
-    for _, row in joined.iterrows():
-        gt_idx = row["gt_idx"]
-        cd_idx = row["cd_idx"]
-
-        if pd.isna(gt_idx) and not pd.isna(cd_idx):
-            geom = cd_filtered.loc[cd_filtered["cd_idx"] == cd_idx, "geometry"]
-        elif not pd.isna(gt_idx):
-            geom = gt_filtered.loc[gt_filtered["gt_idx"] == gt_idx, "geometry"]
-        else:
-            geom = pd.Series([None])
+    joined = polygon_matching_utils.outer_join_idx(gt_filtered, cd_filtered, poly1_prefix="gt", poly2_prefix="cd")
 
-        geometries.append(geom.values[0] if not geom.empty else None)
+    # 조건에 따른 geometry 땡겨오기: gt가 있으면 gt, 없으면 cd geometry
+    gt_geoms = pd.Series(gt_filtered.geometry.values, index=gt_filtered["gt_idx"].to_numpy())
+    cd_geoms = pd.Series(cd_filtered.geometry.values, index=cd_filtered["cd_idx"].to_numpy())
+    gt_geoms = gt_geoms[~gt_geoms.index.duplicated()]
+    cd_geoms = cd_geoms[~cd_geoms.index.duplicated()]
+
+    geometries = np.where(
+        joined["gt_idx"].notna(),
+        gt_geoms.reindex(joined["gt_idx"]).to_numpy(),
+        cd_geoms.reindex(joined["cd_idx"]).to_numpy()
+    )
 
     joined["geometry"] = geometries
     joined_gdf = gpd.GeoDataFrame(joined, geometry="geometry", crs=gt_cur.crs)
@@ -106,12 +105,19 @@ def evaluate_bd(dmap, seg, bd_threshold):
     # dmap 기반 계산 (Recall 기준)
     dmap_tp = (dmap['bd_status'] == 'TP').sum()
     dmap_fn = (dmap['bd_status'] == 'FN').sum()
-    gt_total = dmap_tp + dmap_fn
-    recall = dmap_tp / gt_total if gt_total > 0 else 0
 
     # seg 기반 계산 (Precision 기준)
     seg_tp = (seg['bd_status'] == 'TP').sum()
     seg_fp = (seg['bd_status'] == 'FP').sum()
+
+    # 결과 DataFrame
+    return pd.DataFrame([bd_scores(dmap_tp, dmap_fn, seg_tp, seg_fp, bd_threshold)])
+
+
+def bd_scores(dmap_tp, dmap_fn, seg_tp, seg_fp, bd_threshold):
+    gt_total = dmap_tp + dmap_fn
+    recall = dmap_tp / gt_total if gt_total > 0 else 0
+
     pred_total = seg_tp + seg_fp
     precision = seg_tp / pred_total if pred_total > 0 else 0
 
@@ -121,8 +127,7 @@ def evaluate_bd(dmap, seg, bd_threshold):
     else:
         f1_score = 0
 
-    # 결과 DataFrame
-    result = pd.DataFrame([{
+    return {
         "GT 수": gt_total,
         "Pred 수": pred_total,
         "TP": dmap_tp,
@@ -132,6 +137,4 @@ def evaluate_bd(dmap, seg, bd_threshold):
         "정밀도": round(precision, 3),
         "F1-score": round(f1_score, 3),
         "Threshold": bd_threshold
-    }])
-
-    return result
\ No newline at end of file
+    }
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import contextlib
+import contextvars
+
+try:
+    import resource  # Windows에는 없음 -> peak RSS는 None으로 기록
+except ImportError:
+    resource = None
+
+'''
+pipeline 구간(span)별 계측
+- span(name, **counts): 중첩 가능한 구간, 끝날 때 wall/CPU 시간, peak RSS, 건수(counts)를 JSON lines로 기록
+  counts는 with 블록 안에서 채울 수 있음 (with instrument.span("energy") as counts: counts["pairs"] = ...)
+- configure(log_path, ...)로 켜기 전에는 아무것도 기록하지 않음 (계측 비용 없음)
+  설정은 contextvars로 보관 -> 다른 스레드에서 실행하는 작업은 contextvars.copy_context().run으로 제출해야 같은 설정으로 기록
+- profile: 이 이름의 span은 cProfile로 실행하고 <log_path>.<span>.<n>.prof로 저장 (pstats/snakeviz로 확인)
+CPU 시간은 process 전체 기준이므로 동시에 실행되는 단계가 있으면 함께 합산됨
+'''
+
+_lock = threading.Lock()
+_local = threading.local()
+_run = contextvars.ContextVar("instrument_run", default=None)
+
+
+def configure(log_path, profile=None, **context):
+    # context: 모든 기록에 붙일 값 (예: region, year), log_path=None이면 계측 끄기
+    if not log_path:
+        _run.set(None)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    _run.set({"log_path": log_path, "profile": profile, "context": context, "num_profiles": 0, "profiling": False})
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: byte
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextlib.contextmanager
+def span(name, **counts):
+    run = _run.get()
+    if run is None:
+        yield counts
+        return
+
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(name)
+
+    profiler = start_profile(run, name)
+    start_time = time.time()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    error = None
+    try:
+        yield counts
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record = {
+            **run["context"],
+            "span": name,
+            "path": "/".join(stack),
+            "depth": len(stack) - 1,
+            "thread": threading.current_thread().name,
+            "start": round(start_time, 3),
+            "wall_s": round(time.perf_counter() - start_wall, 4),
+            "cpu_s": round(time.process_time() - start_cpu, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "counts": {key: int(value) for key, value in counts.items()},
+            "error": error,
+            "profile": stop_profile(run, profiler, name)
+        }
+        stack.pop()
+        write(run, record)
+
+
+def start_profile(run, name):
+    # 한 번에 하나의 span만 profile (cProfile은 동시에 여러 개 켤 수 없음)
+    with _lock:
+        if run["profile"] != name or run["profiling"]:
+            return None
+        run["profiling"] = True
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(run, profiler, name):
+    if profiler is None:
+        return None
+    profiler.disable()
+    with _lock:
+        run["num_profiles"] += 1
+        profile_path = f"{os.path.splitext(run['log_path'])[0]}.{name}.{run['num_profiles']}.prof"
+        run["profiling"] = False
+    profiler.dump_stats(profile_path)
+    return profile_path
+
+
+def write(run, record):
+    with _lock:
+        with open(run["log_path"], "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
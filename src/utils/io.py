@@ -1,40 +1,302 @@
-import pandas as pd
-import geopandas as gpd
 import os
-import rasterio
+import json
+import shutil
+import threading
+import contextvars
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from src.common import path_config
+from src.utils import cache, instrument
+from src.utils.lazy import lazy_import
 
+# 무거운 의존성은 처음 사용할 때 import (rasterio는 import_tif 안에서)
+pd = lazy_import("pandas")
+gpd = lazy_import("geopandas")
+np = lazy_import("numpy")
+pyogrio = lazy_import("pyogrio")
+shapely = lazy_import("shapely")
+pyproj = lazy_import("pyproj")
+pq = lazy_import("pyarrow.parquet")
 
-def export_file(df, output_path, file_name):
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
+# GeoDataFrame 저장 형식
+# - shapefile: 최종 산출물 (euc-kr, 열 이름 10자 제한, list 열은 문자열로 저장됨)
+# - parquet: 단계 사이 중간 산출물 (GeoParquet, 열 이름/dtype/list 열 유지, 열 단위 읽기 가능)
+artifact_formats = ("shapefile", "parquet")
 
+# GeoParquet는 feature별 bbox 열(covering)과 함께 row group 단위로 저장
+# -> bbox/fids로 읽을 때 해당하지 않는 row group은 읽지 않음 (타일 단위 매칭)
+parquet_row_group_size = 10000
+
+# 좌표계 변환이 필요한 입력은 변환한 사본을 GeoParquet로 저장해 두고 재사용
+# (원본 shapefile 구성 파일 내용 해시 + 대상 EPSG가 key, 경로는 config.json의 reproject_cache, None이면 캐시하지 않음)
+# 전체 크기가 reproject_cache_max_bytes를 넘으면 matching 캐시와 같이 가장 오래 사용하지 않은 사본부터 삭제
+reproject_cache_dir = path_config.load_common_path("reproject_cache")
+reproject_cache_max_bytes = cache.DEFAULT_MAX_BYTES
+
+
+# 결과 저장은 백그라운드 스레드에서 진행하고 flush_exports에서 완료 대기 및 저장 오류 raise
+# (같은 경로는 제출 순서대로 저장, 임시 경로에 쓴 뒤 rename)
+export_workers = 4
+_export_lock = threading.Lock()
+_export_executor = None
+_exports = []
+_last_export = {}
+
+
+def export_file(df, output_path, file_name, fmt="shapefile"):
+    # 저장 작업을 제출하고 Future 반환 (저장이 끝나기 전까지 df를 수정하지 않아야 함)
     if isinstance(df, gpd.GeoDataFrame):
-        full_path = os.path.join(output_path, f"{file_name}.shp")
-        df.to_file(full_path, driver='ESRI Shapefile', encoding='euc-kr')
+        if fmt not in artifact_formats:
+            raise ValueError(f"Unknown format: {fmt} (shapefile, parquet 중 선택)")
+        extension = "parquet" if fmt == "parquet" else "shp"
+        full_path = os.path.join(output_path, f"{file_name}.{extension}")
 
     elif isinstance(df, pd.DataFrame):
         full_path = os.path.join(output_path, f"{file_name}.csv")
-        df.to_csv(full_path, index=False, encoding='utf-8-sig')
 
     else:
         raise TypeError("error")
 
+    with _export_lock:
+        # 계측 설정(instrument)이 저장 스레드에도 적용되도록 현재 context에서 실행
+        future = export_executor().submit(contextvars.copy_context().run, write_file, df, full_path,
+                                          _last_export.get(full_path))
+        _last_export[full_path] = future
+
+        # 정상 완료된 작업은 목록에서 제거 (실패한 작업은 flush_exports에서 raise하기 위해 유지)
+        _exports[:] = [f for f in _exports if not f.done() or (not f.cancelled() and f.exception() is not None)]
+        _exports.append(future)
+        for path in [path for path, f in _last_export.items() if f.done()]:
+            del _last_export[path]
+    return future
+
+
+def export_executor():
+    # _export_lock 안에서 호출
+    global _export_executor
+    if _export_executor is None:
+        _export_executor = ThreadPoolExecutor(max_workers=export_workers)
+    return _export_executor
+
+
+def after_exports(func, *args):
+    # 지금까지 제출된 저장 작업이 모두 성공하면 func 실행 (저장된 파일 기준 후처리, 예: 입력 파일 지문 기록)
+    with _export_lock:
+        pending = list(_exports)
+        future = export_executor().submit(run_after, pending, func, args)
+        _exports.append(future)
+    return future
+
+
+def run_after(pending, func, args):
+    futures.wait(pending)
+    if any(not f.cancelled() and f.exception() is not None for f in pending):
+        return None  # 저장 오류는 flush_exports에서 raise
+    return func(*args)
+
 
-def import_shapefile(file_path, crs=5186):
-    # 디렉토리일 경우, 안에서 .shp 파일 찾기
+def write_file(df, full_path, previous=None):
+    # 같은 경로의 이전 저장이 끝난 뒤 저장 (나중에 제출한 결과가 남도록)
+    if previous is not None:
+        futures.wait([previous])
+
+    with instrument.span("export", rows=len(df)):
+        output_path = os.path.dirname(full_path)
+        os.makedirs(output_path, exist_ok=True)
+        tmp_tag = f"{os.getpid()}.{threading.get_ident()}.tmp"
+
+        if full_path.endswith('.shp'):
+            # shapefile은 임시 디렉토리에 쓴 뒤 구성 파일(.shp, .dbf, .prj ...)별로 rename (.shp는 마지막)
+            tmp_dir = os.path.join(output_path, f".{os.path.basename(full_path)}.{tmp_tag}")
+            os.makedirs(tmp_dir)
+            try:
+                df.to_file(os.path.join(tmp_dir, os.path.basename(full_path)), driver='ESRI Shapefile', encoding='euc-kr')
+                for f in sorted(os.listdir(tmp_dir), key=lambda f: f.endswith('.shp')):
+                    os.replace(os.path.join(tmp_dir, f), os.path.join(output_path, f))
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        tmp_path = f"{full_path}.{tmp_tag}"
+        try:
+            if full_path.endswith('.parquet'):
+                write_parquet(df, tmp_path)
+            else:
+                df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+            os.replace(tmp_path, full_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def flush_exports():
+    # 제출된 저장 작업이 모두 끝날 때까지 대기, 실패한 작업이 있으면 첫 오류를 raise
+    with _export_lock:
+        pending = list(_exports)
+        _exports.clear()
+
+    futures.wait(pending)
+    for future in pending:
+        if not future.cancelled() and future.exception() is not None:
+            raise future.exception()
+
+
+def resolve_shapefile(file_path):
+    # 디렉토리일 경우, 안에서 .shp 파일 찾기 (같은 디렉토리에 더 최근 .parquet가 있으면 그 파일)
     if os.path.isdir(file_path):
         shp_files = [f for f in os.listdir(file_path) if f.endswith('.shp')]
-        if not shp_files:
-            raise FileNotFoundError(f"No .shp file found in directory: {file_path}")
-        file_path = os.path.join(file_path, shp_files[0])  # 첫 번째 shp 파일로 설정
+        parquet_files = [f for f in os.listdir(file_path) if f.endswith('.parquet')]
+        if not shp_files and not parquet_files:
+            raise FileNotFoundError(f"No .shp or .parquet file found in directory: {file_path}")
+
+        candidates = [os.path.join(file_path, f) for f in parquet_files]
+        if shp_files:
+            candidates.append(os.path.join(file_path, shp_files[0]))  # 첫 번째 shp 파일
+        file_path = max(candidates, key=os.path.getmtime)
+    return file_path
+
+
+def import_shapefile(file_path, crs=5186, **kwargs):
+    # kwargs: columns, bbox, fids, fid_as_index 등 read_file 옵션
+    # file_path 대신 메모리의 GeoDataFrame을 넘기면 같은 옵션을 적용한 사본 반환 (fid = 행 번호)
+    if isinstance(file_path, gpd.GeoDataFrame):
+        gdf = filter_frame(file_path.reset_index(drop=True), **kwargs).copy()
+        if not same_crs(gdf.crs, crs):
+            gdf = gdf.to_crs(epsg=crs)
+        return gdf
+
+    file_path = resolve_shapefile(file_path)
 
-    gdf = gpd.read_file(file_path)
-    if gdf.crs != f"epsg:{crs}":
-        gdf = gdf.to_crs(epsg=crs)
+    with instrument.span("read") as counts:
+        if file_path.endswith('.parquet'):
+            gdf = read_parquet(file_path, **kwargs)
+        elif same_crs(pyogrio.read_info(file_path)['crs'], crs) or reproject_cache_dir is None:
+            gdf = read_vector(file_path, **kwargs)
+        else:
+            gdf = read_parquet(reprojected_copy(file_path, crs), **kwargs)
+
+        if not same_crs(gdf.crs, crs):
+            gdf = gdf.to_crs(epsg=crs)
+        counts["rows"] = len(gdf)
+    return gdf
+
+
+def same_crs(src_crs, epsg):
+    # 문자열 비교 대신 좌표계 정의 비교 ("EPSG:5186" WKT와 "epsg:5186"을 같은 좌표계로 판단)
+    if src_crs is None:
+        return False
+    src_crs = pyproj.CRS.from_user_input(src_crs)
+    return src_crs.to_epsg() == epsg or src_crs.equals(pyproj.CRS.from_epsg(epsg))
+
+
+def read_vector(file_path, **kwargs):
+    # Arrow 경로로 읽기 (columns로 필요한 열만 읽음)
+    # fids 지정 시 pyogrio Arrow 경로가 일부 shapefile에서 잘못된 행을 반환하므로 기본 경로 사용
+    use_arrow = kwargs.get('fids') is None
+    return gpd.read_file(file_path, engine='pyogrio', use_arrow=use_arrow, **kwargs)
+
+
+def reprojected_copy(file_path, crs):
+    key = cache.make_key("reproject", cache.fingerprint_file(file_path), crs)
+    cached_path = os.path.join(reproject_cache_dir, f"{key}.parquet")
+    if os.path.exists(cached_path):
+        os.utime(cached_path)  # LRU 기준 시간 갱신
+        return cached_path
+
+    os.makedirs(reproject_cache_dir, exist_ok=True)
+    gdf = read_vector(file_path).to_crs(epsg=crs)
+    tmp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write_parquet(gdf, tmp_path)
+    os.replace(tmp_path, cached_path)
+    cache.evict(reproject_cache_dir, reproject_cache_max_bytes, pattern="*.parquet")
+    return cached_path
+
+
+def write_parquet(gdf, file_path):
+    gdf.to_parquet(file_path, index=False, write_covering_bbox=True, row_group_size=parquet_row_group_size)
+
+
+def read_parquet(file_path, columns=None, bbox=None, fids=None, fid_as_index=False):
+    # read_file과 같은 옵션으로 GeoParquet 읽기 (fid = 행 번호)
+    # fids가 없는 row group, bbox 열 통계가 bbox와 겹치지 않는 row group은 읽지 않고
+    # 읽은 row group 안에서 read_file과 같은 기준으로 다시 거름 (bbox 열이 없는 파일은 bbox로 row group을 거르지 않음)
+    parquet_file = pq.ParquetFile(file_path)
+    geo = json.loads(parquet_file.schema_arrow.metadata[b"geo"])
+    geometry = geo["primary_column"]
+    covering = geo["columns"][geometry].get("covering", {}).get("bbox")
+    metadata = parquet_file.metadata
+    starts = np.concatenate([[0], np.cumsum([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)])])
+
+    groups = np.arange(metadata.num_row_groups)
+    if fids is not None:
+        groups = np.intersect1d(groups, np.searchsorted(starts, np.asarray(fids, dtype=np.int64), side="right") - 1)
+    if bbox is not None and covering:
+        bounds = bbox.total_bounds if hasattr(bbox, 'total_bounds') else bbox
+        groups = [g for g in groups if row_group_intersects(metadata.row_group(g), covering, bounds)]
+
+    if columns is None:
+        columns = [name for name in parquet_file.schema_arrow.names if not covering or name != covering["xmin"][0]]
+    else:
+        columns = list(columns) + [geometry]
+    df = parquet_file.read_row_groups(list(groups), columns=columns).to_pandas()
+    df.index = np.concatenate([np.arange(starts[g], starts[g + 1]) for g in groups] + [np.empty(0, dtype=np.int64)])
+    crs = geo["columns"][geometry].get("crs", "OGC:CRS84")
+    df[geometry] = gpd.GeoSeries.from_wkb(df[geometry].to_numpy(), index=df.index)
+    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs=crs and pyproj.CRS.from_user_input(crs))
+
+    if fids is not None:
+        gdf = gdf.loc[np.asarray(fids, dtype=np.int64)]
+    return filter_frame(gdf, bbox=bbox, fid_as_index=fid_as_index)
+
+
+def row_group_intersects(row_group, covering, bounds):
+    # row group의 bbox 열 min/max 통계가 bounds와 겹치는지 (통계가 없으면 읽음)
+    stats = {}
+    for i in range(row_group.num_columns):
+        column = row_group.column(i)
+        stats[tuple(column.path_in_schema.split("."))] = column.statistics
+    xmin, ymin, xmax, ymax = (stats.get(tuple(covering[key])) for key in ("xmin", "ymin", "xmax", "ymax"))
+    if any(stat is None or not stat.has_min_max for stat in (xmin, ymin, xmax, ymax)):
+        return True
+    return xmin.min <= bounds[2] and ymin.min <= bounds[3] and xmax.max >= bounds[0] and ymax.max >= bounds[1]
+
+
+def filter_frame(gdf, columns=None, bbox=None, fids=None, fid_as_index=False):
+    if columns is not None:
+        gdf = gdf[list(columns) + ['geometry']]
+    if fids is not None:
+        gdf = gdf.iloc[np.asarray(fids)]
+    if bbox is not None:
+        # read_file과 같이 bbox와 겹치는 feature의 bbox 기준
+        bounds = bbox.total_bounds if hasattr(bbox, 'total_bounds') else bbox
+        gdf = gdf.iloc[np.sort(gdf.sindex.query(shapely.box(*bounds)))]
+    if not fid_as_index:
+        gdf = gdf.reset_index(drop=True)
     return gdf
 
 
+def read_bounds(file_path):
+    # 속성/geometry 없이 feature별 bbox만 읽기 (fid, (4, n) bounds)
+    if isinstance(file_path, gpd.GeoDataFrame):
+        return np.arange(len(file_path)), shapely.bounds(np.asarray(file_path.geometry.values)).T
+    file_path = resolve_shapefile(file_path)
+    if file_path.endswith('.parquet'):
+        # bbox 열이 있으면 geometry를 읽지 않음
+        geo = json.loads(pq.read_schema(file_path).metadata[b"geo"])
+        covering = geo["columns"][geo["primary_column"]].get("covering", {}).get("bbox")
+        if covering:
+            table = pq.read_table(file_path, columns=[covering["xmin"][0]]).column(0).combine_chunks()
+            bounds = np.vstack([table.field(covering[key][1]).to_numpy(zero_copy_only=False)
+                                for key in ("xmin", "ymin", "xmax", "ymax")])
+            return np.arange(bounds.shape[1]), bounds
+        geoms = gpd.read_parquet(file_path, columns=['geometry']).geometry.values
+        return np.arange(len(geoms)), shapely.bounds(np.asarray(geoms)).T
+    return pyogrio.read_bounds(file_path)
+
+
 def import_tif(tif_path):
+    import rasterio  # raster 입력이 있는 실행에서만 import
+
     with rasterio.open(tif_path) as src:
         data = src.read()         # shape: (bands, height, width)
         crs = src.crs
@@ -0,0 +1,42 @@
+import sys
+import types
+import importlib
+import threading
+
+'''
+무거운 의존성(pandas, geopandas, scipy, rasterio ...)을 처음 사용할 때 import
+- lazy_import("pandas")는 대리 module을 반환하고, 첫 속성 접근(pd.DataFrame 등)에서 실제 import
+- --help나 raster를 쓰지 않는 실행처럼 의존성을 쓰지 않는 경로는 import 비용이 없음
+- DAG 단계는 스레드에서 동시에 실행되므로 실제 import는 lock 안에서 한 번만 실행
+  (importlib.util.LazyLoader는 Python 3.12.3 이전 버전에서 스레드 동시 접근 시 오류 가능)
+- "from X import Y" 대신 module 속성으로 사용 (box -> shapely.box)
+'''
+
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        # 실제 module을 불러온 뒤에는 __dict__에 속성이 복사되어 여기로 오지 않음
+        module = load(self)
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(load(self))
+
+
+def lazy_import(name):
+    # 이미 import된 module은 그대로 반환
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def load(proxy):
+    with _lock:
+        module = proxy.__dict__.get("_lazy_module")
+        if module is None:
+            module = importlib.import_module(proxy.__name__)
+            proxy.__dict__.update(module.__dict__)
+            proxy.__dict__["_lazy_module"] = module
+    return module
@@ -0,0 +1,45 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from src.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+'''
+GEOS 연산 병렬 실행
+- thread: shapely 2 배열 연산(intersection, union, area 등)은 GIL을 해제하므로 스레드로 충분
+- process: component별 unary_union처럼 Python 루프가 섞인 작업
+결과는 항상 입력 chunk 순서대로 반환되므로 worker 수와 관계없이 동일한 결과를 보장
+'''
+
+executors = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor
+}
+
+
+def resolve_workers(workers):
+    # None/0/1: 단일 실행, 음수: CPU 코어 수
+    if not workers:
+        return 1
+    if workers < 0:
+        return os.cpu_count() or 1
+    return int(workers)
+
+
+def split_chunks(n, workers, chunks_per_worker=4):
+    # [0, n)을 연속 구간으로 분할 (worker당 여러 chunk로 부하 분산)
+    num_chunks = max(1, min(n, resolve_workers(workers) * chunks_per_worker))
+    bounds = np.linspace(0, n, num_chunks + 1).astype(np.int64)
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(num_chunks) if bounds[i] < bounds[i + 1]]
+
+
+def map_chunks(func, chunks, workers=1, backend="thread"):
+    if backend not in executors:
+        raise ValueError(f"Unknown backend: {backend} (thread, process 중 선택)")
+
+    workers = resolve_workers(workers)
+    if workers == 1 or len(chunks) <= 1:
+        return [func(chunk) for chunk in chunks]
+
+    with executors[backend](max_workers=min(workers, len(chunks))) as executor:
+        return list(executor.map(func, chunks))